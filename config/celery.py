@@ -1,9 +1,25 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from django.conf import settings
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+def task_queue(task_name):
+    """Имя очереди, в которую маршрутизируется задача"""
+    return app.amqp.router.route({}, task_name)['queue'].name
+
+
+class QueueAnnotations:
+    """Ограничения времени задач из настроек их очереди (CELERY_WORKER_QUEUES)"""
+
+    def annotate(self, task):
+        options = settings.CELERY_WORKER_QUEUES.get(task_queue(task.name), {})
+        return {
+            key: options[key] for key in ('time_limit', 'soft_time_limit') if key in options
+        }
@@ -1,8 +1,11 @@
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
+from kombu import Queue
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -10,7 +13,9 @@ load_dotenv(BASE_DIR / '.env')
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
+
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
 
 ALLOWED_HOSTS = []
 
@@ -41,6 +46,7 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "learning_platform.response_cache.AnonymousResponseCacheMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -116,7 +122,7 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.RoleJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -127,6 +133,10 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # Роли пользователя передаются в access-токене
+    "AUTH_TOKEN_CLASSES": ("users.tokens.RoleAccessToken",),
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.RoleTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.RoleTokenRefreshSerializer",
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -141,7 +151,8 @@ CSRF_TRUSTED_ORIGINS = [
 STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
 
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Пуловый бэкенд держит открытыми SMTP-соединения процесса между отправками
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "learning_platform.mail.PooledEmailBackend")
 
 EMAIL_HOST = "smtp.mail.ru"
 EMAIL_PORT = 465
@@ -154,6 +165,42 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 EMAIL_ADMIN = EMAIL_HOST_USER
 
 SERVER_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = 30
+# Свободных соединений на процесс, писем на соединение и секунд простоя,
+# после которых соединение из пула проверяется командой NOOP
+EMAIL_POOL_SIZE = 4
+EMAIL_POOL_MAX_MESSAGES = 100
+EMAIL_POOL_CHECK_AFTER = 30
+
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+
+# Общий кэш (Redis) для ролей пользователей, блокировок и других служебных
+# данных. Сброс кэша и блокировки через cache.add работают только с кэшем,
+# общим для всех процессов, поэтому локальный кэш процесса допустим лишь
+# в режиме DEBUG и в тестах
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+elif not (DEBUG or TESTING):
+    raise ImproperlyConfigured('CACHE_LOCATION must be set when DEBUG is off.')
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Кэш ответов на анонимные GET-запросы: префикс адреса -> область (для сброса
+# сигналами), время свежести soft_ttl и время хранения ttl в секундах.
+# HTML-страница swagger не кэшируется: она выставляет cookie csrftoken
+RESPONSE_CACHE_RULES = {
+    '/learning_platform/course/': {'scope': 'courses', 'soft_ttl': 30, 'ttl': 60 * 10},
+    '/swagger/': {'scope': 'schema', 'soft_ttl': 60 * 5, 'ttl': 60 * 60},
+}
 
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
@@ -161,14 +208,95 @@ CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
+
+# Задачи приложения лежат в tascs.py, который не находит autodiscover_tasks
+CELERY_IMPORTS = ('learning_platform.tascs',)
+
+# Очереди Celery: каждую обслуживает свой воркер, поэтому массовые рассылки
+# не задерживают проверку ответов, а многочасовые задачи analytics - сводки
+# активности, которые запускаются каждые 5 минут. concurrency и prefetch_multiplier -
+# параметры воркера очереди (команда python manage.py celery_topology печатает
+# команды запуска), time_limit и soft_time_limit применяются к задачам очереди
+CELERY_WORKER_QUEUES = {
+    'default': {'concurrency': 4, 'prefetch_multiplier': 4, 'time_limit': 5 * 60, 'soft_time_limit': 4 * 60},
+    'email': {'concurrency': 8, 'prefetch_multiplier': 1, 'time_limit': 30 * 60, 'soft_time_limit': 25 * 60},
+    'grading': {'concurrency': 4, 'prefetch_multiplier': 1, 'time_limit': 5 * 60, 'soft_time_limit': 4 * 60},
+    'analytics': {'concurrency': 1, 'prefetch_multiplier': 1, 'time_limit': 60 * 60, 'soft_time_limit': 55 * 60},
+    'rollups': {'concurrency': 1, 'prefetch_multiplier': 1, 'time_limit': 5 * 60, 'soft_time_limit': 4 * 60},
+}
+CELERY_TASK_QUEUES = tuple(Queue(name, routing_key=name) for name in CELERY_WORKER_QUEUES)
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_DEFAULT_ROUTING_KEY = 'default'
+CELERY_TASK_ROUTES = {
+    'learning_platform.tascs.flush_course_updates': {'queue': 'email'},
+    'learning_platform.tascs.grade_pending_answers': {'queue': 'grading'},
+    'learning_platform.tascs.rebuild_leaderboards': {'queue': 'analytics'},
+    'learning_platform.tascs.rollup_activity': {'queue': 'rollups'},
+    'learning_platform.tascs.analyze_test_items': {'queue': 'analytics'},
+    'learning_platform.tascs.archive_old_answers': {'queue': 'analytics'},
+}
+CELERY_TASK_ANNOTATIONS = ('config.celery.QueueAnnotations',)
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
-# CELERY_BEAT_SCHEDULE = {
-#     'last_login_check': {
-#         'task': 'learning_platform.tasks.',  # Путь к задаче
-#         'schedule': timedelta(days=1),  # Расписание выполнения задачи (например, каждые 10 минут)
-#     },
-# }
+CELERY_BEAT_SCHEDULE = {
+    # Невыполненные запуски истекают, а не копятся у брокера, пока воркер
+    # очереди default недоступен: каждый запуск опустошает всю очередь
+    'dispatch_outbox': {
+        'task': 'learning_platform.tascs.dispatch_outbox',
+        'schedule': timedelta(seconds=1),
+        'options': {'expires': 1},
+    },
+    'grade_pending_answers': {
+        'task': 'learning_platform.tascs.grade_pending_answers',
+        'schedule': timedelta(seconds=5),
+    },
+    'rebuild_leaderboards': {
+        'task': 'learning_platform.tascs.rebuild_leaderboards',
+        'schedule': timedelta(hours=1),
+    },
+    'rollup_activity': {
+        'task': 'learning_platform.tascs.rollup_activity',
+        'schedule': timedelta(minutes=5),
+    },
+    'analyze_test_items': {
+        'task': 'learning_platform.tascs.analyze_test_items',
+        'schedule': timedelta(days=1),
+    },
+    'archive_old_answers': {
+        'task': 'learning_platform.tascs.archive_old_answers',
+        'schedule': timedelta(days=1),
+    },
+    'flush_course_updates': {
+        'task': 'learning_platform.tascs.flush_course_updates',
+        'schedule': timedelta(minutes=1),
+    },
+}
+
+# Ответы студентов сохраняются сразу, а проверяются задачей grade_pending_answers
+GRADING_ASYNC = os.getenv('GRADING_ASYNC', 'False') == 'True'
+GRADING_BATCH_SIZE = 500
+
+# Задачи из запросов пишутся в таблицу OutboxMessage в той же транзакции и
+# отправляются брокеру пачками по OUTBOX_BATCH_SIZE (задача dispatch_outbox или
+# команда python manage.py dispatch_outbox)
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_POLL_INTERVAL = 1
+
+# Письма подписчикам отправляются пачками через одно SMTP-соединение
+NOTIFICATION_BATCH_SIZE = 500
+
+# Изменения материалов курса собираются в одно письмо-сводку: оно уходит, когда
+# материалы не менялись NOTIFICATION_QUIET_PERIOD, но не позже NOTIFICATION_MAX_DELAY
+# после первого изменения
+NOTIFICATION_QUIET_PERIOD = timedelta(minutes=int(os.getenv('NOTIFICATION_QUIET_MINUTES', 15)))
+NOTIFICATION_MAX_DELAY = timedelta(hours=1)
+
+# Ответы завершенных курсов старше ANSWER_ARCHIVE_AFTER_DAYS дней переносятся
+# из БД в сжатые файлы в ANSWER_ARCHIVE_DIR
+ANSWER_ARCHIVE_DIR = os.getenv('ANSWER_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+ANSWER_ARCHIVE_AFTER_DAYS = int(os.getenv('ANSWER_ARCHIVE_AFTER_DAYS', 365))
+ANSWER_ARCHIVE_SEGMENT_SIZE = 50000
+
 LOGGING_FILE = os.path.join(BASE_DIR, 'logs/django.log')
 
 LOGGING = {
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LearningPlatformConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "learning_platform"
+
+    def ready(self):
+        import learning_platform.signals  # noqa: F401
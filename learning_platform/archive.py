@@ -0,0 +1,140 @@
+import gzip
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from learning_platform.models import AnswerArchiveSegment, Course, StudentAnswer
+from learning_platform.streaming import iter_ndjson
+
+ARCHIVE_COLUMNS = (
+    "id",
+    "student_id",
+    "test_id",
+    "selected_answer",
+    "is_correct",
+    "grading_status",
+    "timestamp",
+)
+
+
+def archive_root():
+    return Path(settings.ANSWER_ARCHIVE_DIR)
+
+
+def archive_cutoff(now=None):
+    return (now or timezone.now()) - timedelta(days=settings.ANSWER_ARCHIVE_AFTER_DAYS)
+
+
+def archived_course_ids():
+    """Курсы, часть ответов которых уже перенесена в архив"""
+    return set(AnswerArchiveSegment.objects.values_list("course_id", flat=True).distinct())
+
+
+def archivable_answers(course_id, cutoff):
+    """Проверенные ответы курса старше cutoff, кроме опорных попыток.
+
+    Первая попытка и первый правильный ответ студента по каждому тесту
+    остаются в БД: по ним count_progress определяет, начат и пройден ли
+    тест, когда студент отвечает снова после архивации.
+    """
+    graded = StudentAnswer.objects.filter(
+        test__material__course_id=course_id,
+        grading_status=StudentAnswer.GradingStatus.GRADED,
+    ).order_by()
+    first_attempts = graded.values("student_id", "test_id").annotate(first_id=Min("id")).values("first_id")
+    first_correct = (
+        graded.filter(is_correct=True)
+        .values("student_id", "test_id")
+        .annotate(first_id=Min("id"))
+        .values("first_id")
+    )
+    return (
+        graded.filter(timestamp__lt=cutoff)
+        .exclude(id__in=first_attempts)
+        .exclude(id__in=first_correct)
+    )
+
+
+def write_segment(path, rows):
+    """Записывает строки в сжатый NDJSON-файл.
+
+    Файл пишется под временным именем, сбрасывается на диск и только
+    затем переименовывается, поэтому по итоговому пути не бывает
+    недописанных файлов.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f"{path.name}.tmp")
+    with open(temporary, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as compressed:
+            for chunk in iter_ndjson(rows, ARCHIVE_COLUMNS):
+                compressed.write(chunk.encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(temporary, path)
+
+
+def archive_course_answers(course, cutoff, segment_size=None):
+    """Переносит ответы курса старше cutoff (см. archivable_answers) в файлы архива.
+
+    Ответы выбираются пачками по segment_size в порядке id. Каждая пачка
+    сначала записывается в файл, затем в одной транзакции создается запись
+    каталога и из БД удаляются именно записанные ответы. Возвращает число перенесенных ответов.
+    """
+    segment_size = segment_size or settings.ANSWER_ARCHIVE_SEGMENT_SIZE
+    archived = 0
+    while True:
+        rows = list(
+            archivable_answers(course.pk, cutoff)
+            .order_by("id")
+            .values_list(*ARCHIVE_COLUMNS)[:segment_size]
+        )
+        if not rows:
+            return archived
+
+        first_id, last_id = rows[0][0], rows[-1][0]
+        timestamps = [row[-1] for row in rows]
+        relative_path = Path(f"course_{course.pk}") / f"answers_{first_id}_{last_id}.ndjson.gz"
+        path = archive_root() / relative_path
+        write_segment(path, rows)
+
+        with transaction.atomic():
+            AnswerArchiveSegment.objects.create(
+                course=course,
+                path=str(relative_path),
+                first_answer_id=first_id,
+                last_answer_id=last_id,
+                oldest_timestamp=min(timestamps),
+                newest_timestamp=max(timestamps),
+                answers_count=len(rows),
+                size_bytes=path.stat().st_size,
+            )
+            # Удаляются ровно записанные в файл ответы: строки диапазона id,
+            # ставшие архивируемыми после чтения пачки, останутся до следующего раза
+            StudentAnswer.objects.filter(id__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
+
+
+def archive_answers(now=None, segment_size=None):
+    """Архивирует старые ответы всех завершенных курсов"""
+    now = now or timezone.now()
+    cutoff = archive_cutoff(now)
+    return sum(
+        archive_course_answers(course, cutoff, segment_size)
+        for course in Course.objects.filter(finished_at__lte=now).order_by("id")
+    )
+
+
+def iter_archived_answers(course_id, student_id=None):
+    """Строки NDJSON из архива курса, при student_id - только его ответы"""
+    segments = AnswerArchiveSegment.objects.filter(course_id=course_id).order_by("first_answer_id")
+    for segment in segments.values_list("path", flat=True):
+        with gzip.open(archive_root() / segment, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                if student_id is None or json.loads(line)["student_id"] == student_id:
+                    yield line
@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+
+from django.core.cache import cache
+from rest_framework.utils.encoders import JSONEncoder
+
+from learning_platform.models import AnswerOption, Course, Material, Test
+
+
+def bundle_cache_key(course_id):
+    return f"learning_platform:bundle:{course_id}"
+
+
+def course_bundle_data(course_id):
+    """Содержимое курса: материалы, тесты и варианты ответов без признака
+    правильности. Собирается четырьмя запросами независимо от размера курса."""
+    course = Course.objects.filter(pk=course_id).values("id", "title", "description").first()
+    if course is None:
+        return None
+
+    materials = list(
+        Material.objects.filter(course_id=course_id)
+        .order_by("id")
+        .values("id", "title", "description", "video_url")
+    )
+    tests = {}
+    for test in (
+        Test.objects.filter(material__course_id=course_id)
+        .order_by("id")
+        .values("id", "material_id", "question")
+    ):
+        test["answer_options"] = []
+        tests[test["id"]] = test
+    for option in (
+        AnswerOption.objects.filter(test__material__course_id=course_id)
+        .order_by("id")
+        .values("id", "test_id", "answer_text")
+    ):
+        tests[option.pop("test_id")]["answer_options"].append(option)
+
+    by_material = {material["id"]: material for material in materials}
+    for material in materials:
+        material["tests"] = []
+    for test in tests.values():
+        by_material[test.pop("material_id")]["tests"].append(test)
+
+    course["materials"] = materials
+    return course
+
+
+def build_course_bundle(course_id):
+    """Собирает сжатый gzip JSON курса и кладет его в кэш.
+
+    ETag - хэш несжатого содержимого, поэтому пересборка без изменений
+    не сбрасывает кэш клиентов. Возвращает словарь с ключами etag и
+    content или None, если курса нет.
+    """
+    data = course_bundle_data(course_id)
+    if data is None:
+        forget_course_bundle(course_id)
+        return None
+    content = JSONEncoder(ensure_ascii=False).encode(data).encode("utf-8")
+    bundle = {
+        "etag": f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+        "content": gzip.compress(content, mtime=0),
+    }
+    cache.set(bundle_cache_key(course_id), bundle, None)
+    return bundle
+
+
+def get_course_bundle(course_id):
+    """Собранный пакет курса; при промахе кэша собирается сразу"""
+    return cache.get(bundle_cache_key(course_id)) or build_course_bundle(course_id)
+
+
+def forget_course_bundle(*course_ids):
+    cache.delete_many([bundle_cache_key(course_id) for course_id in course_ids])
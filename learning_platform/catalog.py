@@ -0,0 +1,57 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = "learning_platform:catalog:version"
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_catalog_version():
+    """Текущая версия каталога курсов.
+
+    Версия - случайный токен, а не счетчик: после очистки кэша ETag
+    старых ответов не совпадут с новыми.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Делает недействительными все закэшированные страницы каталога"""
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_catalog():
+    # Повторный сброс после коммита отбрасывает страницы, собранные
+    # другими запросами до того, как изменения стали видны
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_page_digest(version, request):
+    """Хэш версии каталога и параметров страницы (адрес, формат ответа)"""
+    source = "|".join(
+        [version, request.build_absolute_uri(), request.accepted_renderer.format]
+    )
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def catalog_page_key(digest):
+    return f"learning_platform:catalog:page:{digest}"
+
+
+def catalog_etag(digest):
+    return f'"{digest}"'
+
+
+def get_catalog_page(digest):
+    return cache.get(catalog_page_key(digest))
+
+
+def set_catalog_page(digest, data):
+    cache.set(catalog_page_key(digest), data, CATALOG_CACHE_TIMEOUT)
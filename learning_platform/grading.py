@@ -0,0 +1,166 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+
+from learning_platform.models import StudentAnswer, Test
+from learning_platform.progress import record_graded_answers
+
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def answer_key_cache_key(test_id, version):
+    return f"learning_platform:answer_key:{test_id}:{version}"
+
+
+def answer_key_version_key(test_id):
+    return f"learning_platform:answer_key_version:{test_id}"
+
+
+def get_answer_key_versions(test_ids):
+    """Версии ключей тестов: test_id -> случайный токен.
+
+    Ключ теста хранится в кэше под его версией, а сброс меняет версию.
+    Загрузчик, прочитавший БД до изменения вариантов ответа, запишет ключ
+    под старой версией, и его никто не прочитает.
+    """
+    version_keys = {answer_key_version_key(test_id): test_id for test_id in test_ids}
+    cached = cache.get_many(version_keys)
+    missing = [key for key in version_keys if key not in cached]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        cached.update(cache.get_many(missing))
+    return {version_keys[key]: version for key, version in cached.items()}
+
+
+def load_answer_keys(test_ids):
+    """Загружает правильные ответы и кладет их в кэш.
+
+    Загружаются ключи всех тестов материалов, к которым относятся test_ids:
+    ответы на соседние тесты обычно приходят следом. Версии ключей читаются
+    до чтения вариантов ответа, поэтому тесты материалов выбираются
+    отдельным запросом.
+    """
+    material_ids = Test.objects.filter(id__in=test_ids).values("material_id")
+    loaded_ids = list(
+        Test.objects.filter(material_id__in=material_ids).values_list("id", flat=True)
+    )
+    versions = get_answer_key_versions(loaded_ids)
+    rows = (
+        Test.objects.filter(id__in=loaded_ids)
+        .annotate(
+            correct_options=FilteredRelation(
+                "answer_options", condition=Q(answer_options__is_correct=True)
+            )
+        )
+        .values_list("id", "correct_options__answer_text")
+    )
+    answer_keys = {}
+    for test_id, answer_text in rows:
+        correct = answer_keys.setdefault(test_id, set())
+        if answer_text is not None:
+            correct.add(answer_text)
+
+    cache.set_many(
+        {
+            answer_key_cache_key(test_id, versions[test_id]): list(correct)
+            for test_id, correct in answer_keys.items()
+        },
+        ANSWER_KEY_CACHE_TIMEOUT,
+    )
+    return answer_keys
+
+
+def get_answer_keys(test_ids):
+    """Правильные ответы тестов: test_id -> множество текстов.
+
+    Ключи берутся из кэша, при промахе догружаются материалы целиком.
+    """
+    versions = get_answer_key_versions(test_ids)
+    cache_keys = {
+        answer_key_cache_key(test_id, version): test_id for test_id, version in versions.items()
+    }
+    cached = cache.get_many(cache_keys)
+    answer_keys = {cache_keys[key]: set(correct) for key, correct in cached.items()}
+
+    missing = [test_id for key, test_id in cache_keys.items() if key not in cached]
+    if missing:
+        loaded = load_answer_keys(missing)
+        answer_keys.update({test_id: loaded.get(test_id, set()) for test_id in missing})
+    return answer_keys
+
+
+def forget_answer_keys(*test_ids):
+    """Меняет версии ключей тестов, делая закэшированные ключи недоступными"""
+    cache.set_many(
+        {answer_key_version_key(test_id): uuid.uuid4().hex for test_id in test_ids}, None
+    )
+
+
+def is_correct_answer(answer_keys, test_id, selected_answer):
+    return selected_answer in answer_keys.get(test_id, ())
+
+
+def submit_answers(student, items, grade=True):
+    """Сохраняет пачку ответов студента.
+
+    items - список словарей с ключами test и selected_answer. Правильные
+    ответы берутся из кэша ключей, все StudentAnswer создаются одним
+    bulk_create в транзакции. С grade=False ответы сохраняются без проверки
+    и проверяются позже задачей grade_pending_answers.
+    """
+    if grade:
+        answer_keys = get_answer_keys({item["test"] for item in items})
+    answers = [
+        StudentAnswer(
+            student_id=student.pk,
+            test_id=item["test"],
+            selected_answer=item["selected_answer"],
+            is_correct=grade
+            and is_correct_answer(answer_keys, item["test"], item["selected_answer"]),
+            grading_status=(
+                StudentAnswer.GradingStatus.GRADED if grade else StudentAnswer.GradingStatus.PENDING
+            ),
+        )
+        for item in items
+    ]
+    with transaction.atomic():
+        answers = StudentAnswer.objects.bulk_create(answers)
+        if grade:
+            record_graded_answers(answers)
+    return answers
+
+
+def grade_pending_batch(batch_size):
+    """Проверяет до batch_size непроверенных ответов.
+
+    Ответы блокируются с пропуском уже заблокированных строк, поэтому
+    несколько воркеров могут проверять очередь параллельно. Ключи ответов
+    загружаются один раз на пачку, результат записывается двумя UPDATE.
+    Возвращает проверенные ответы.
+    """
+    with transaction.atomic():
+        answers = list(
+            StudentAnswer.objects.select_for_update(skip_locked=True)
+            .filter(grading_status=StudentAnswer.GradingStatus.PENDING)
+            .order_by("id")
+            .only("id", "student_id", "test_id", "selected_answer", "timestamp")[:batch_size]
+        )
+        if not answers:
+            return []
+
+        answer_keys = get_answer_keys({answer.test_id for answer in answers})
+        for answer in answers:
+            answer.is_correct = is_correct_answer(
+                answer_keys, answer.test_id, answer.selected_answer
+            )
+            answer.grading_status = StudentAnswer.GradingStatus.GRADED
+
+        for is_correct in (True, False):
+            StudentAnswer.objects.filter(
+                id__in=[answer.id for answer in answers if answer.is_correct == is_correct]
+            ).update(is_correct=is_correct, grading_status=StudentAnswer.GradingStatus.GRADED)
+        record_graded_answers(answers)
+    return answers
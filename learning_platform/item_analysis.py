@@ -0,0 +1,225 @@
+from itertools import islice
+
+import numpy as np
+from django.db.models import F, OuterRef, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from learning_platform.archive import archived_course_ids
+from learning_platform.models import AnswerOption, Course, StudentAnswer, Test, TestItemStatistics
+
+ITEM_ANALYSIS_CHUNK_SIZE = 20000
+# Доля студентов в верхней и нижней группах для индекса дискриминации
+DISCRIMINATION_GROUP = 0.27
+# Строки матрицы переводятся во float блоками, чтобы не копировать ее целиком
+ROW_BLOCK_SIZE = 8192
+
+
+def first_attempts(course_id):
+    """Первые проверенные попытки студентов по тестам курса.
+
+    Строки: (student_id, test_id, is_correct, option_id), где option_id -
+    выбранный вариант ответа или 0, если ответ не совпал ни с одним вариантом.
+    """
+    option = (
+        AnswerOption.objects.filter(
+            test_id=OuterRef("test_id"), answer_text=OuterRef("selected_answer")
+        )
+        .order_by("id")
+        .values("id")[:1]
+    )
+    return (
+        StudentAnswer.objects.filter(
+            test__material__course_id=course_id,
+            grading_status=StudentAnswer.GradingStatus.GRADED,
+        )
+        .annotate(
+            attempt=Window(
+                RowNumber(),
+                partition_by=[F("student_id"), F("test_id")],
+                order_by=F("id").asc(),
+            ),
+            option_id=Coalesce(Subquery(option), Value(0)),
+        )
+        .filter(attempt=1)
+        .values_list("student_id", "test_id", "is_correct", "option_id")
+    )
+
+
+def axis_index(axis, values):
+    """Позиции значений на отсортированной оси и маска найденных значений."""
+    index = np.searchsorted(axis, values)
+    found = index < len(axis)
+    found[found] = axis[index[found]] == values[found]
+    return index, found
+
+
+def load_response_matrix(course_id, test_ids, option_ids, chunk_size=ITEM_ANALYSIS_CHUNK_SIZE):
+    """Матрица студент x тест по первым попыткам и счетчики выбора вариантов.
+
+    Возвращает correct (int8, 1 - правильный ответ), answered (bool),
+    option_counts (по option_ids) и other_counts (ответы вне вариантов, по тестам).
+    Строки из БД читаются пачками и раскладываются в матрицу без цикла по строкам.
+    Оси читаются отдельными запросами, поэтому строки студентов и тестов,
+    появившихся позже, отбрасываются, а студенты без ответов не попадают в матрицу.
+    """
+    students = np.fromiter(
+        StudentAnswer.objects.filter(
+            test__material__course_id=course_id,
+            grading_status=StudentAnswer.GradingStatus.GRADED,
+        )
+        .order_by("student_id")
+        .values_list("student_id", flat=True)
+        .distinct(),
+        dtype=np.int64,
+    )
+    correct = np.zeros((len(students), len(test_ids)), dtype=np.int8)
+    answered = np.zeros((len(students), len(test_ids)), dtype=bool)
+    option_counts = np.zeros(len(option_ids), dtype=np.int64)
+    other_counts = np.zeros(len(test_ids), dtype=np.int64)
+
+    rows = first_attempts(course_id).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        data = np.array(chunk, dtype=np.int64)
+        student_index, student_found = axis_index(students, data[:, 0])
+        test_index, test_found = axis_index(test_ids, data[:, 1])
+        matched = student_found & test_found
+        data, student_index, test_index = data[matched], student_index[matched], test_index[matched]
+        correct[student_index, test_index] = data[:, 2]
+        answered[student_index, test_index] = True
+
+        option_index, known = axis_index(option_ids, data[:, 3])
+        option_counts += np.bincount(option_index[known], minlength=len(option_ids))
+        other_counts += np.bincount(test_index[~known], minlength=len(test_ids))
+
+    respondents = answered.any(axis=1)
+    return correct[respondents], answered[respondents], option_counts, other_counts
+
+
+def item_statistics(correct, answered):
+    """Показатели всех тестов сразу по матрице первых попыток.
+
+    difficulty - доля правильных ответов среди ответивших, discrimination -
+    разница этих долей в верхних и нижних 27% студентов по сумме баллов,
+    point_biserial - корреляция ответа на тест с суммой баллов по остальным
+    тестам. Где показатель не определен, возвращается nan.
+    """
+    students_count, tests_count = correct.shape
+    respondents = answered.sum(axis=0, dtype=np.int64)
+    correct_count = correct.sum(axis=0, dtype=np.int64)
+    totals = correct.sum(axis=1, dtype=np.float64)
+
+    # Суммы по ответившим: балл, квадрат балла и балл при правильном ответе
+    total_sum = np.zeros(tests_count)
+    total_square_sum = np.zeros(tests_count)
+    correct_total_sum = np.zeros(tests_count)
+    for start in range(0, students_count, ROW_BLOCK_SIZE):
+        block = slice(start, start + ROW_BLOCK_SIZE)
+        block_totals = totals[block]
+        block_answered = answered[block].astype(np.float64)
+        total_sum += block_totals @ block_answered
+        total_square_sum += (block_totals * block_totals) @ block_answered
+        correct_total_sum += block_totals @ correct[block].astype(np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difficulty = correct_count / respondents
+        # Балл по остальным тестам: сумма баллов без ответа на сам тест
+        rest_mean = (total_sum - correct_count) / respondents
+        rest_variance = (
+            total_square_sum - 2 * correct_total_sum + correct_count
+        ) / respondents - rest_mean**2
+        covariance = (correct_total_sum - correct_count) / respondents - difficulty * rest_mean
+        point_biserial = covariance / np.sqrt(difficulty * (1 - difficulty) * rest_variance)
+
+        group_size = int(round(students_count * DISCRIMINATION_GROUP))
+        if group_size:
+            order = np.argsort(totals, kind="stable")
+            lower, upper = order[:group_size], order[-group_size:]
+            discrimination = correct[upper].sum(axis=0) / answered[upper].sum(axis=0) - correct[
+                lower
+            ].sum(axis=0) / answered[lower].sum(axis=0)
+        else:
+            discrimination = np.full(tests_count, np.nan)
+
+    return {
+        "students_count": respondents,
+        "difficulty": difficulty,
+        "discrimination": discrimination,
+        "point_biserial": point_biserial,
+    }
+
+
+def optional_float(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def analyze_course_items(course_id, chunk_size=ITEM_ANALYSIS_CHUNK_SIZE):
+    """Рассчитывает и сохраняет статистику всех тестов курса.
+
+    Возвращает число тестов, для которых записана статистика.
+    """
+    test_ids = np.fromiter(
+        Test.objects.filter(material__course_id=course_id).order_by("id").values_list("id", flat=True),
+        dtype=np.int64,
+    )
+    if not len(test_ids):
+        return 0
+    options = list(
+        AnswerOption.objects.filter(test__material__course_id=course_id)
+        .order_by("id")
+        .values_list("id", "test_id")
+    )
+    option_ids = np.array([option_id for option_id, _ in options], dtype=np.int64)
+
+    correct, answered, option_counts, other_counts = load_response_matrix(
+        course_id, test_ids, option_ids, chunk_size
+    )
+    stats = item_statistics(correct, answered)
+
+    shares = {test_id: {} for test_id in test_ids.tolist()}
+    respondents = dict(zip(test_ids.tolist(), stats["students_count"].tolist()))
+    for (option_id, test_id), count in zip(options, option_counts.tolist()):
+        if respondents[test_id]:
+            shares[test_id][str(option_id)] = round(count / respondents[test_id], 4)
+    for test_id, count in zip(test_ids.tolist(), other_counts.tolist()):
+        if count:
+            shares[test_id]["other"] = round(count / respondents[test_id], 4)
+
+    TestItemStatistics.objects.bulk_create(
+        [
+            TestItemStatistics(
+                test_id=test_id,
+                students_count=respondents[test_id],
+                difficulty=optional_float(stats["difficulty"][index]),
+                discrimination=optional_float(stats["discrimination"][index]),
+                point_biserial=optional_float(stats["point_biserial"][index]),
+                option_shares=shares[test_id],
+            )
+            for index, test_id in enumerate(test_ids.tolist())
+        ],
+        update_conflicts=True,
+        unique_fields=["test"],
+        update_fields=[
+            "students_count",
+            "difficulty",
+            "discrimination",
+            "point_biserial",
+            "option_shares",
+            "computed_at",
+        ],
+    )
+    return len(test_ids)
+
+
+def analyze_items(course_ids=None):
+    """Статистика тестов перечисленных курсов.
+
+    По умолчанию - всех курсов, кроме тех, чьи ответы частично перенесены
+    в архив: для них сохраняется статистика, рассчитанная до архивации.
+    """
+    if course_ids is None:
+        course_ids = (
+            Course.objects.exclude(id__in=archived_course_ids())
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+    return sum(analyze_course_items(course_id) for course_id in course_ids)
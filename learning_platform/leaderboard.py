@@ -0,0 +1,247 @@
+import bisect
+import threading
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef, Q, Window
+from django.db.models.functions import RowNumber
+
+from learning_platform.archive import archived_course_ids
+from learning_platform.models import Course, StudentAnswer, StudentProgress
+from learning_platform.subscriptions import subscription_index
+from users.models import Subscription
+
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MAX_SIZE = 100
+
+
+def leaderboard_score(completed_tests, first_attempt_correct, attempted_tests):
+    """Очки студента: число тестов, решенных правильно, плюс половина доли
+    тестов, решенных с первой попытки. Повторная отправка уже правильного
+    ответа очков не добавляет. Добавка меньше единицы, поэтому она только
+    упорядочивает студентов с одинаковым числом решенных тестов."""
+    accuracy = first_attempt_correct / attempted_tests if attempted_tests else 0
+    return round(completed_tests + accuracy / 2, 6)
+
+
+class LocalLeaderboardStore:
+    """Замена сортированных множеств Redis внутри процесса.
+
+    Для каждого курса хранит очки студентов и список пар (-очки, студент),
+    упорядоченный через bisect. Используется в разработке и тестах, когда
+    CACHE_LOCATION не задан; данные не разделяются между процессами.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.scores = {}
+        self.ranking = {}
+
+    def _discard(self, course_id, member):
+        score = self.scores.get(course_id, {}).pop(member, None)
+        if score is not None:
+            ranking = self.ranking[course_id]
+            del ranking[bisect.bisect_left(ranking, (-score, member))]
+
+    def add(self, course_id, mapping):
+        with self.lock:
+            for member, score in mapping.items():
+                self._discard(course_id, member)
+                self.scores.setdefault(course_id, {})[member] = score
+                bisect.insort(self.ranking.setdefault(course_id, []), (-score, member))
+
+    def remove(self, course_id, *members):
+        with self.lock:
+            for member in members:
+                self._discard(course_id, member)
+
+    def replace(self, course_id, mapping):
+        with self.lock:
+            self.scores[course_id] = dict(mapping)
+            self.ranking[course_id] = sorted((-score, member) for member, score in mapping.items())
+
+    def top(self, course_id, limit):
+        with self.lock:
+            return [(member, -score) for score, member in self.ranking.get(course_id, [])[:limit]]
+
+    def rank(self, course_id, member):
+        with self.lock:
+            score = self.scores.get(course_id, {}).get(member)
+            if score is None:
+                return None
+            # Число студентов с большим числом очков
+            return bisect.bisect_left(self.ranking[course_id], (-score,)) + 1, score
+
+
+class RedisLeaderboardStore:
+    """Рейтинги курсов в сортированных множествах Redis.
+
+    ZADD, ZREM, ZREVRANGE и ZCOUNT выполняются за O(log n), полная
+    замена рейтинга собирается во временном ключе и подменяется RENAME.
+    """
+
+    def __init__(self, location):
+        self.client = redis.Redis.from_url(location)
+
+    @staticmethod
+    def key(course_id):
+        return f"learning_platform:leaderboard:{course_id}"
+
+    def add(self, course_id, mapping):
+        if mapping:
+            self.client.zadd(self.key(course_id), mapping)
+
+    def remove(self, course_id, *members):
+        if members:
+            self.client.zrem(self.key(course_id), *members)
+
+    def replace(self, course_id, mapping):
+        key = self.key(course_id)
+        if not mapping:
+            self.client.delete(key)
+            return
+        rebuild_key = f"{key}:rebuild"
+        pipeline = self.client.pipeline()
+        pipeline.delete(rebuild_key)
+        pipeline.zadd(rebuild_key, mapping)
+        pipeline.rename(rebuild_key, key)
+        pipeline.execute()
+
+    def top(self, course_id, limit):
+        rows = self.client.zrevrange(self.key(course_id), 0, limit - 1, withscores=True)
+        return [(int(member), score) for member, score in rows]
+
+    def rank(self, course_id, member):
+        key = self.key(course_id)
+        score = self.client.zscore(key, member)
+        if score is None:
+            return None
+        return self.client.zcount(key, f"({score}", "+inf") + 1, score
+
+
+class Leaderboard:
+    """Рейтинг подписанных студентов курса.
+
+    Очки пересчитываются из таблицы прогресса после каждого проверенного
+    ответа, а периодическая задача rebuild_leaderboards строит рейтинг
+    заново по ответам, исправляя возможные расхождения. Студенты с равными
+    очками делят одно место.
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+
+    @property
+    def store(self):
+        if self._store is None:
+            if settings.CACHE_LOCATION:
+                self._store = RedisLeaderboardStore(settings.CACHE_LOCATION)
+            else:
+                self._store = LocalLeaderboardStore()
+        return self._store
+
+    def refresh(self, pairs):
+        """Обновляет очки студентов по парам (student_id, course_id)"""
+        pairs = set(pairs)
+        if not pairs:
+            return
+        rows = StudentProgress.objects.filter(
+            student_id__in={student_id for student_id, _ in pairs},
+            course_id__in={course_id for _, course_id in pairs},
+        ).values_list(
+            "student_id",
+            "course_id",
+            "completed_tests",
+            "first_attempt_correct_tests",
+            "attempted_tests",
+        )
+        scores = {
+            (student_id, course_id): leaderboard_score(*counters)
+            for student_id, course_id, *counters in rows
+            if (student_id, course_id) in pairs
+        }
+
+        added = defaultdict(dict)
+        removed = defaultdict(list)
+        for student_id, course_id in pairs:
+            if (student_id, course_id) in scores and course_id in subscription_index.course_ids(
+                student_id
+            ):
+                added[course_id][student_id] = scores[(student_id, course_id)]
+            else:
+                removed[course_id].append(student_id)
+        for course_id, mapping in added.items():
+            self.store.add(course_id, mapping)
+        for course_id, student_ids in removed.items():
+            self.store.remove(course_id, *student_ids)
+
+    def rebuild(self):
+        """Строит рейтинги всех курсов заново по проверенным ответам.
+
+        Первая попытка по каждому тесту определяется оконной функцией
+        ROW_NUMBER() в БД, число решенных тестов - группировкой.
+        Рейтинги курсов с архивированными ответами не меняются.
+        Возвращает число студентов в рейтингах.
+        """
+        archived = archived_course_ids()
+        answers = StudentAnswer.objects.exclude(test__material__course_id__in=archived).filter(
+            Exists(
+                Subscription.objects.filter(
+                    user_id=OuterRef("student_id"),
+                    course_id=OuterRef("test__material__course_id"),
+                    is_subscribed=True,
+                )
+            ),
+            grading_status=StudentAnswer.GradingStatus.GRADED,
+        ).order_by()
+        completed = answers.values("student_id", "test__material__course_id").annotate(
+            completed=Count("test_id", distinct=True, filter=Q(is_correct=True))
+        )
+        first_attempts = (
+            answers.annotate(
+                attempt=Window(
+                    RowNumber(),
+                    partition_by=[F("student_id"), F("test_id")],
+                    order_by=F("id").asc(),
+                )
+            )
+            .filter(attempt=1)
+            .values_list("student_id", "test__material__course_id", "is_correct")
+        )
+
+        # (student_id, course_id) -> [решенных тестов, с первой попытки, начатых тестов]
+        counters = defaultdict(lambda: [0, 0, 0])
+        for row in completed.iterator():
+            counters[(row["student_id"], row["test__material__course_id"])][0] = row["completed"]
+        for student_id, course_id, is_correct in first_attempts.iterator():
+            counters[(student_id, course_id)][1] += is_correct
+            counters[(student_id, course_id)][2] += 1
+
+        courses = {
+            course_id: {}
+            for course_id in Course.objects.exclude(id__in=archived).values_list("id", flat=True)
+        }
+        for (student_id, course_id), values in counters.items():
+            courses.setdefault(course_id, {})[student_id] = leaderboard_score(*values)
+        for course_id, mapping in courses.items():
+            self.store.replace(course_id, mapping)
+        return len(counters)
+
+    def top(self, course_id, limit=LEADERBOARD_SIZE):
+        entries = []
+        for position, (student_id, score) in enumerate(self.store.top(course_id, limit), 1):
+            same_score = entries and entries[-1]["score"] == score
+            rank = entries[-1]["rank"] if same_score else position
+            entries.append({"rank": rank, "student": student_id, "score": score})
+        return entries
+
+    def position(self, course_id, student_id):
+        found = self.store.rank(course_id, student_id)
+        if found is None:
+            return None
+        rank, score = found
+        return {"rank": rank, "student": student_id, "score": score}
+
+
+leaderboard = Leaderboard()
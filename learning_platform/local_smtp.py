@@ -0,0 +1,74 @@
+import socketserver
+import threading
+import time
+
+
+class SMTPRequestHandler(socketserver.StreamRequestHandler):
+    """Минимальный диалог SMTP: принимает любые адреса и письма"""
+
+    def reply(self, *lines):
+        for line in lines[:-1]:
+            self.wfile.write(f"250-{line}\r\n".encode())
+        self.wfile.write(f"{lines[-1]}\r\n".encode())
+
+    def handle(self):
+        self.server.connection_opened()
+        # Задержка заменяет TCP- и TLS-рукопожатие с удаленным сервером
+        time.sleep(self.server.connect_delay)
+        self.reply("220 localhost ESMTP")
+        for raw_line in self.rfile:
+            line = raw_line.decode("utf-8", "replace").rstrip("\r\n")
+            command = line.split(" ", 1)[0].upper()
+            if command == "EHLO":
+                self.reply("localhost", "AUTH PLAIN LOGIN", "250 8BITMIME")
+            elif command in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "AUTH":
+                self.reply("235 Authentication successful")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data_line in self.rfile:
+                    if data_line.rstrip(b"\r\n") == b".":
+                        break
+                self.server.message_received()
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Локальная замена SMTP-сервера для тестов и замеров скорости отправки.
+
+    Письма не сохраняются, считаются только соединения и письма.
+    connect_delay - задержка перед приветствием на каждое новое соединение.
+    Порт 0 выбирает свободный порт; фактический - в server_address.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, connect_delay=0):
+        super().__init__((host, port), SMTPRequestHandler)
+        self.connect_delay = connect_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+    def connection_opened(self):
+        with self.lock:
+            self.connections += 1
+
+    def message_received(self):
+        with self.lock:
+            self.messages += 1
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
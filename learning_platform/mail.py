@@ -0,0 +1,143 @@
+import os
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+
+
+class SMTPConnectionPool:
+    """Свободные SMTP-соединения процесса по серверу и учетной записи.
+
+    Хранит тройки (соединение, отправлено писем, время возврата в пул).
+    Соединение выдается последним возвращенным: оно с наибольшей
+    вероятностью еще не закрыто сервером.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = {}
+
+    def acquire(self, key):
+        with self.lock:
+            connections = self.idle.get(key)
+            return connections.pop() if connections else None
+
+    def release(self, key, connection, sent):
+        """Возвращает соединение в пул; False, если пул заполнен"""
+        with self.lock:
+            connections = self.idle.setdefault(key, [])
+            if len(connections) >= settings.EMAIL_POOL_SIZE:
+                return False
+            connections.append((connection, sent, time.monotonic()))
+            return True
+
+    def clear(self):
+        """Забывает соединения, не закрывая их (сокеты принадлежат
+        родительскому процессу после fork)"""
+        with self.lock:
+            self.idle = {}
+
+    def close_all(self):
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for connection, _, _ in connections:
+                quit_connection(connection)
+
+
+def quit_connection(connection):
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+
+def is_disconnect(error):
+    """Обрыв соединения: SMTPServerDisconnected или ошибка сокета
+    (ConnectionResetError, ssl.SSLError), но не ответ сервера с ошибкой"""
+    return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(
+        error, smtplib.SMTPException
+    )
+
+
+def is_alive(connection):
+    try:
+        return connection.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+pool = SMTPConnectionPool()
+# Дочерние процессы воркера Celery не должны писать в сокеты родителя
+os.register_at_fork(after_in_child=pool.clear)
+
+
+class PooledEmailBackend(EmailBackend):
+    """SMTP-бэкенд, не закрывающий соединения после отправки.
+
+    Вместо QUIT соединение возвращается в пул процесса, и следующая отправка
+    обходится без подключения, TLS-рукопожатия и авторизации. Соединение,
+    простоявшее в пуле дольше EMAIL_POOL_CHECK_AFTER секунд, проверяется
+    командой NOOP. После EMAIL_POOL_MAX_MESSAGES писем соединение
+    открывается заново, а при обрыве во время отправки (в том числе сброс
+    SSL-сокета) письмо отправляется повторно через новое соединение.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent_on_connection = 0
+
+    @property
+    def pool_key(self):
+        return (self.host, self.port, self.username, self.use_ssl, self.use_tls)
+
+    def open(self):
+        if self.connection:
+            return False
+        while entry := pool.acquire(self.pool_key):
+            connection, sent, released_at = entry
+            idle = time.monotonic() - released_at
+            if idle < settings.EMAIL_POOL_CHECK_AFTER or is_alive(connection):
+                self.connection, self.sent_on_connection = connection, sent
+                return True
+            quit_connection(connection)
+        self.sent_on_connection = 0
+        return super().open()
+
+    def close(self):
+        if self.connection is None:
+            return
+        if self.sent_on_connection < settings.EMAIL_POOL_MAX_MESSAGES and pool.release(
+            self.pool_key, self.connection, self.sent_on_connection
+        ):
+            self.connection = None
+            return
+        super().close()
+
+    def reconnect(self):
+        """Закрывает текущее соединение и открывает новое в обход пула"""
+        super().close()
+        self.sent_on_connection = 0
+        return super().open()
+
+    def _send(self, email_message):
+        if self.sent_on_connection >= settings.EMAIL_POOL_MAX_MESSAGES:
+            self.reconnect()
+        try:
+            try:
+                sent = super()._send(email_message)
+            except OSError as error:
+                if not is_disconnect(error):
+                    raise
+                if not self.reconnect():
+                    return False
+                sent = super()._send(email_message)
+        except (smtplib.SMTPException, OSError):
+            # Соединение в неизвестном состоянии не возвращается в пул
+            super().close()
+            raise
+        if sent:
+            self.sent_on_connection += 1
+        return sent
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from learning_platform.item_analysis import analyze_items
+
+
+class Command(BaseCommand):
+    """Рассчитываем статистику тестов по первым попыткам студентов командой
+    python manage.py analyze_test_items [course_id ...]"""
+
+    help = "Рассчитать сложность, дискриминацию и доли вариантов ответа для тестов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_ids", nargs="*", type=int)
+
+    def handle(self, *args, **options):
+        count = analyze_items(options["course_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Рассчитана статистика: {count} тестов"))
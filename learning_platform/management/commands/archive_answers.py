@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from learning_platform.archive import archive_answers
+
+
+class Command(BaseCommand):
+    """Переносим старые ответы завершенных курсов в сжатые файлы командой
+    python manage.py archive_answers"""
+
+    help = "Перенести ответы завершенных курсов старше ANSWER_ARCHIVE_AFTER_DAYS дней в архив"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--segment-size", type=int)
+
+    def handle(self, *args, **options):
+        count = archive_answers(segment_size=options["segment_size"])
+        self.stdout.write(self.style.SUCCESS(f"Перенесено в архив: {count} ответов"))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.mail import get_connection, send_mail
+from django.core.management import BaseCommand
+
+from learning_platform.local_smtp import LocalSMTPServer
+from learning_platform.mail import pool
+
+BACKENDS = {
+    "smtp": "django.core.mail.backends.smtp.EmailBackend",
+    "pooled": "learning_platform.mail.PooledEmailBackend",
+}
+
+
+class Command(BaseCommand):
+    """Сравниваем скорость отправки писем обычным и пуловым SMTP-бэкендом командой
+    python manage.py benchmark_email"""
+
+    help = "Замерить число писем в секунду при отправке по одному письму за вызов send_mail"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200)
+        parser.add_argument(
+            "--connect-delay",
+            type=float,
+            default=0.05,
+            help="Задержка локального сервера на новое соединение, секунды",
+        )
+
+    def send(self, backend, address, count):
+        host, port = address
+        started = time.perf_counter()
+        for index in range(count):
+            # Новый экземпляр бэкенда на письмо, как в задаче на одного подписчика
+            connection = get_connection(
+                BACKENDS[backend], host=host, port=port, username="", password="",
+                use_ssl=False, use_tls=False,
+            )
+            send_mail(
+                "Обновление курса", "Текст письма", "noreply@example.com",
+                [f"student{index}@example.com"], connection=connection,
+            )
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        count = options["messages"]
+        for backend in BACKENDS:
+            with LocalSMTPServer(connect_delay=options["connect_delay"]) as server:
+                elapsed = self.send(backend, server.server_address, count)
+                pool.close_all()
+            self.stdout.write(
+                f"{backend}: {count / elapsed:.1f} писем/с, "
+                f"соединений: {server.connections}, писем принято: {server.messages}"
+            )
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from config.celery import app, task_queue
+
+
+class Command(BaseCommand):
+    """Выводим очереди Celery, маршруты задач и команды запуска воркеров командой
+    python manage.py celery_topology"""
+
+    help = "Показать очереди Celery, задачи в них и параметры воркеров"
+
+    def handle(self, *args, **options):
+        app.loader.import_default_modules()
+        tasks = {}
+        for name, task in sorted(app.tasks.items()):
+            if not name.startswith("celery."):
+                tasks.setdefault(task_queue(name), []).append(task)
+
+        for queue, queue_options in settings.CELERY_WORKER_QUEUES.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Очередь {queue}"))
+            self.stdout.write(
+                f"  celery -A config worker -Q {queue} -n {queue}@%h "
+                f"-c {queue_options['concurrency']} "
+                f"--prefetch-multiplier {queue_options['prefetch_multiplier']}"
+            )
+            for task in tasks.pop(queue, []):
+                self.stdout.write(
+                    f"  {task.name} (time_limit={task.time_limit}, "
+                    f"soft_time_limit={task.soft_time_limit})"
+                )
+        # Задачи в очередях без воркера не будут выполнены
+        for queue, queue_tasks in tasks.items():
+            for task in queue_tasks:
+                self.stdout.write(self.style.WARNING(f"{task.name}: очередь {queue} не обслуживается"))
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from learning_platform.outbox import dispatch_outbox
+
+
+class Command(BaseCommand):
+    """Отправляем брокеру задачи из исходящей очереди отдельным процессом командой
+    python manage.py dispatch_outbox"""
+
+    help = "Отправлять брокеру задачи из таблицы OutboxMessage пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--once", action="store_true", help="Опустошить очередь один раз и завершиться"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = dispatch_outbox(batch_size=options["batch_size"])
+            if options["once"]:
+                self.stdout.write(self.style.SUCCESS(f"Отправлено задач: {count}"))
+                return
+            if not count:
+                time.sleep(settings.OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand, CommandError
+
+from learning_platform.models import Course
+from learning_platform.reports import GRADEBOOK_FORMATS, iter_gradebook
+
+
+class Command(BaseCommand):
+    """Выгружаем все ответы студентов по курсу командой
+    python manage.py export_gradebook <course_id> --format csv --output gradebook.csv"""
+
+    help = "Выгрузить ведомость ответов студентов по курсу в CSV или NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_id", type=int)
+        parser.add_argument("--format", choices=list(GRADEBOOK_FORMATS), default="csv")
+        parser.add_argument("--output", help="Файл для записи (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        if not Course.objects.filter(pk=options["course_id"]).exists():
+            raise CommandError(f"Курс {options['course_id']} не найден")
+
+        chunks = iter_gradebook(options["course_id"], options["format"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from learning_platform.progress import rebuild_progress
+
+
+class Command(BaseCommand):
+    """Пересчитываем таблицы прогресса студентов по всем ответам командой
+    python manage.py rebuild_progress"""
+
+    help = "Пересчитать прогресс студентов по курсам и материалам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_progress(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитан прогресс: {count} записей"))
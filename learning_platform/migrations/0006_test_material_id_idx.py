@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 19:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0005_alter_course_pay_amount_course"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="test",
+            index=models.Index(fields=["material", "id"], name="test_material_id_idx"),
+        ),
+    ]
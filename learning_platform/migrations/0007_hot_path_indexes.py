@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0006_test_material_id_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="answeroption",
+            index=models.Index(
+                fields=["test", "is_correct"], name="answeroption_test_correct_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="studentanswer",
+            index=models.Index(
+                fields=["test", "student", "timestamp"],
+                name="studentanswer_test_student_idx",
+            ),
+        ),
+    ]
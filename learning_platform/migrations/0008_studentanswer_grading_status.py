@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-18 19:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0007_hot_path_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="studentanswer",
+            name="grading_status",
+            field=models.CharField(
+                choices=[("pending", "ожидает проверки"), ("graded", "проверен")],
+                default="graded",
+                max_length=10,
+                verbose_name="статус проверки",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="studentanswer",
+            index=models.Index(
+                condition=models.Q(("grading_status", "pending")),
+                fields=["id"],
+                name="studentanswer_pending_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,147 @@
+# Generated by Django 5.1 on 2026-10-18 19:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0008_studentanswer_grading_status"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MaterialProgress",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "answers_count",
+                    models.PositiveIntegerField(default=0, verbose_name="ответов"),
+                ),
+                (
+                    "correct_answers_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="правильных ответов"
+                    ),
+                ),
+                (
+                    "attempted_tests",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="начатых тестов"
+                    ),
+                ),
+                (
+                    "completed_tests",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="тестов с правильным ответом"
+                    ),
+                ),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="learning_platform.course",
+                        verbose_name="курс",
+                    ),
+                ),
+                (
+                    "material",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="learning_platform.material",
+                        verbose_name="обучающий материал",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="студент",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Прогресс по материалу",
+                "verbose_name_plural": "Прогресс по материалам",
+                "indexes": [
+                    models.Index(
+                        fields=["student", "course"], name="materialprogress_course_idx"
+                    )
+                ],
+                "unique_together": {("student", "material")},
+            },
+        ),
+        migrations.CreateModel(
+            name="StudentProgress",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "answers_count",
+                    models.PositiveIntegerField(default=0, verbose_name="ответов"),
+                ),
+                (
+                    "correct_answers_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="правильных ответов"
+                    ),
+                ),
+                (
+                    "attempted_tests",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="начатых тестов"
+                    ),
+                ),
+                (
+                    "completed_tests",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="тестов с правильным ответом"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="обновлено"),
+                ),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="learning_platform.course",
+                        verbose_name="курс",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="студент",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Прогресс студента",
+                "verbose_name_plural": "Прогресс студентов",
+                "unique_together": {("student", "course")},
+            },
+        ),
+    ]
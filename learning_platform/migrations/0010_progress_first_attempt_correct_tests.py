@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0009_student_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="materialprogress",
+            name="first_attempt_correct_tests",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="тестов, решенных с первой попытки"
+            ),
+        ),
+        migrations.AddField(
+            model_name="studentprogress",
+            name="first_attempt_correct_tests",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="тестов, решенных с первой попытки"
+            ),
+        ),
+    ]
@@ -0,0 +1,138 @@
+# Generated by Django 5.1 on 2026-10-18 19:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0010_progress_first_attempt_correct_tests"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnswerActivityRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("hour", "час"), ("day", "день")],
+                        max_length=4,
+                        verbose_name="период",
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField(verbose_name="начало периода")),
+                (
+                    "answers_count",
+                    models.PositiveIntegerField(default=0, verbose_name="ответов"),
+                ),
+                (
+                    "correct_answers_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="правильных ответов"
+                    ),
+                ),
+                (
+                    "active_students",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="активных студентов"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка активности",
+                "verbose_name_plural": "Сводки активности",
+            },
+        ),
+        migrations.CreateModel(
+            name="RollupCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=50, unique=True, verbose_name="название"
+                    ),
+                ),
+                (
+                    "high_water_mark",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="учтено до"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Отметка сводки",
+                "verbose_name_plural": "Отметки сводок",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="studentanswer",
+            index=models.Index(
+                fields=["timestamp"], name="studentanswer_timestamp_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="answeractivityrollup",
+            name="course",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="learning_platform.course",
+                verbose_name="курс",
+            ),
+        ),
+        migrations.AddField(
+            model_name="answeractivityrollup",
+            name="material",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="learning_platform.material",
+                verbose_name="обучающий материал",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="answeractivityrollup",
+            index=models.Index(
+                fields=["course", "period", "bucket_start"],
+                name="activity_rollup_course_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="answeractivityrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("material__isnull", False)),
+                fields=("period", "bucket_start", "material"),
+                name="activity_rollup_material_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="answeractivityrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("material__isnull", True)),
+                fields=("period", "bucket_start", "course"),
+                name="activity_rollup_course_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1 on 2026-10-18 19:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0011_answer_activity_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestItemStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "students_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="ответивших студентов"
+                    ),
+                ),
+                (
+                    "difficulty",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="доля правильных ответов"
+                    ),
+                ),
+                (
+                    "discrimination",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="индекс дискриминации"
+                    ),
+                ),
+                (
+                    "point_biserial",
+                    models.FloatField(
+                        blank=True,
+                        null=True,
+                        verbose_name="точечно-бисериальная корреляция",
+                    ),
+                ),
+                (
+                    "option_shares",
+                    models.JSONField(
+                        default=dict, verbose_name="доли вариантов ответа"
+                    ),
+                ),
+                (
+                    "computed_at",
+                    models.DateTimeField(auto_now=True, verbose_name="рассчитано"),
+                ),
+                (
+                    "test",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="item_statistics",
+                        to="learning_platform.test",
+                        verbose_name="тест",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика теста",
+                "verbose_name_plural": "Статистика тестов",
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0012_test_item_statistics"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Новый индекс покрывает те же запросы по (test, student), второй
+        # индекс на таблице с самой частой записью не нужен
+        migrations.RemoveIndex(
+            model_name="studentanswer",
+            name="studentanswer_test_student_idx",
+        ),
+        migrations.AddIndex(
+            model_name="studentanswer",
+            index=models.Index(
+                fields=["test", "student", "-timestamp", "-id"],
+                name="studentanswer_latest_idx",
+            ),
+        ),
+    ]
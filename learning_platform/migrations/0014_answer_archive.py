@@ -0,0 +1,84 @@
+# Generated by Django 5.1 on 2026-10-18 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0013_studentanswer_latest_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="finished_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="дата завершения курса"
+            ),
+        ),
+        migrations.CreateModel(
+            name="AnswerArchiveSegment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="путь к файлу"
+                    ),
+                ),
+                (
+                    "first_answer_id",
+                    models.PositiveBigIntegerField(verbose_name="первый ответ"),
+                ),
+                (
+                    "last_answer_id",
+                    models.PositiveBigIntegerField(verbose_name="последний ответ"),
+                ),
+                (
+                    "oldest_timestamp",
+                    models.DateTimeField(verbose_name="самый ранний ответ"),
+                ),
+                (
+                    "newest_timestamp",
+                    models.DateTimeField(verbose_name="самый поздний ответ"),
+                ),
+                ("answers_count", models.PositiveIntegerField(verbose_name="ответов")),
+                (
+                    "size_bytes",
+                    models.PositiveBigIntegerField(verbose_name="размер файла"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="создан"),
+                ),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="learning_platform.course",
+                        verbose_name="курс",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Архив ответов",
+                "verbose_name_plural": "Архивы ответов",
+                "indexes": [
+                    models.Index(
+                        fields=["course", "first_answer_id"],
+                        name="archive_segment_course_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1 on 2026-10-18 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0014_answer_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingCourseUpdate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "first_changed_at",
+                    models.DateTimeField(verbose_name="первое изменение"),
+                ),
+                (
+                    "changed_at",
+                    models.DateTimeField(verbose_name="последнее изменение"),
+                ),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="learning_platform.course",
+                        verbose_name="курс",
+                    ),
+                ),
+                (
+                    "material",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="learning_platform.material",
+                        verbose_name="материал",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Неразосланное изменение",
+                "verbose_name_plural": "Неразосланные изменения",
+                "indexes": [
+                    models.Index(
+                        fields=["course", "changed_at"],
+                        name="pending_update_course_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0015_pending_course_update"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("task", models.CharField(max_length=255, verbose_name="задача")),
+                ("args", models.JSONField(default=list, verbose_name="аргументы")),
+                (
+                    "kwargs",
+                    models.JSONField(
+                        default=dict, verbose_name="именованные аргументы"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="создана"),
+                ),
+            ],
+            options={
+                "verbose_name": "Задача в исходящей очереди",
+                "verbose_name_plural": "Исходящая очередь задач",
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1 on 2026-10-18 20:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0016_outbox_message"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="materialprogress",
+            name="materialprogress_course_idx",
+        ),
+        migrations.AlterField(
+            model_name="answeroption",
+            name="test",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="answer_options",
+                to="learning_platform.test",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="materialprogress",
+            name="student",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="студент",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="studentanswer",
+            name="test",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="learning_platform.test",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="test",
+            name="material",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tests",
+                to="learning_platform.material",
+                verbose_name="обучающий материал",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="materialprogress",
+            index=models.Index(
+                fields=["student", "course", "material"],
+                name="materialprogress_course_idx",
+            ),
+        ),
+    ]
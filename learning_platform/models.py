@@ -19,6 +19,7 @@ class Course(models.Model):
     pay_amount_course = models.DecimalField(
         max_digits=10, decimal_places=2, verbose_name="стоимость курса"
     )
+    finished_at = models.DateTimeField(**NULLABLE, verbose_name="дата завершения курса")
 
     def __str__(self):
         return f"{self.title}"
@@ -57,6 +58,8 @@ class Test(models.Model):
         related_name="tests",
         on_delete=models.CASCADE,
         verbose_name="обучающий материал",
+        # Покрывается индексом test_material_id_idx
+        db_index=False,
     )
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -71,11 +74,16 @@ class Test(models.Model):
     class Meta:
         verbose_name = "Тест"
         verbose_name_plural = "Тесты"
+        indexes = [
+            # Постраничный вывод тестов по ключу (material_id, id)
+            models.Index(fields=["material", "id"], name="test_material_id_idx"),
+        ]
 
 
 class AnswerOption(models.Model):
+    # Покрывается индексом answeroption_test_correct_idx
     test = models.ForeignKey(
-        Test, related_name="answer_options", on_delete=models.CASCADE
+        Test, related_name="answer_options", on_delete=models.CASCADE, db_index=False
     )
     answer_text = models.CharField(max_length=255)
     is_correct = models.BooleanField(default=False)
@@ -92,14 +100,28 @@ class AnswerOption(models.Model):
     class Meta:
         verbose_name = "Ответы на тест"
         verbose_name_plural = "Ответы на тесты"
+        indexes = [
+            models.Index(fields=["test", "is_correct"], name="answeroption_test_correct_idx"),
+        ]
 
 
 class StudentAnswer(models.Model):
+    class GradingStatus(models.TextChoices):
+        PENDING = "pending", "ожидает проверки"
+        GRADED = "graded", "проверен"
+
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    test = models.ForeignKey(Test, on_delete=models.CASCADE)
+    # Покрывается индексом studentanswer_latest_idx
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, db_index=False)
     selected_answer = models.CharField(max_length=255)
     is_correct = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
+    grading_status = models.CharField(
+        max_length=10,
+        choices=GradingStatus.choices,
+        default=GradingStatus.GRADED,
+        verbose_name="статус проверки",
+    )
 
     def __str__(self):
         return f"{self.is_correct}"
@@ -107,3 +129,224 @@ class StudentAnswer(models.Model):
     class Meta:
         verbose_name = "Ответы студента"
         verbose_name_plural = "Ответы студента"
+        indexes = [
+            # Ответы студента по тесту, последняя попытка первой
+            # (DISTINCT ON и подзапрос в режиме latest)
+            models.Index(
+                fields=["test", "student", "-timestamp", "-id"], name="studentanswer_latest_idx"
+            ),
+            # Очередь ответов на проверку: индекс содержит только непроверенные
+            models.Index(
+                fields=["id"],
+                condition=models.Q(grading_status="pending"),
+                name="studentanswer_pending_idx",
+            ),
+            # Выборка новых ответов для сводок активности
+            models.Index(fields=["timestamp"], name="studentanswer_timestamp_idx"),
+        ]
+
+
+class StudentProgress(models.Model):
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="студент"
+    )
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="курс")
+    answers_count = models.PositiveIntegerField(default=0, verbose_name="ответов")
+    correct_answers_count = models.PositiveIntegerField(
+        default=0, verbose_name="правильных ответов"
+    )
+    attempted_tests = models.PositiveIntegerField(default=0, verbose_name="начатых тестов")
+    completed_tests = models.PositiveIntegerField(
+        default=0, verbose_name="тестов с правильным ответом"
+    )
+    first_attempt_correct_tests = models.PositiveIntegerField(
+        default=0, verbose_name="тестов, решенных с первой попытки"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="обновлено")
+
+    def __str__(self):
+        return f"{self.student} - {self.course}"
+
+    class Meta:
+        verbose_name = "Прогресс студента"
+        verbose_name_plural = "Прогресс студентов"
+        unique_together = ("student", "course")
+
+
+class MaterialProgress(models.Model):
+    # Покрывается уникальным индексом (student, material)
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="студент", db_index=False
+    )
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="курс")
+    material = models.ForeignKey(
+        Material, on_delete=models.CASCADE, verbose_name="обучающий материал"
+    )
+    answers_count = models.PositiveIntegerField(default=0, verbose_name="ответов")
+    correct_answers_count = models.PositiveIntegerField(
+        default=0, verbose_name="правильных ответов"
+    )
+    attempted_tests = models.PositiveIntegerField(default=0, verbose_name="начатых тестов")
+    completed_tests = models.PositiveIntegerField(
+        default=0, verbose_name="тестов с правильным ответом"
+    )
+    first_attempt_correct_tests = models.PositiveIntegerField(
+        default=0, verbose_name="тестов, решенных с первой попытки"
+    )
+
+    def __str__(self):
+        return f"{self.student} - {self.material}"
+
+    class Meta:
+        verbose_name = "Прогресс по материалу"
+        verbose_name_plural = "Прогресс по материалам"
+        unique_together = ("student", "material")
+        indexes = [
+            # Прогресс студента по курсу в порядке материалов
+            models.Index(
+                fields=["student", "course", "material"], name="materialprogress_course_idx"
+            ),
+        ]
+
+
+class AnswerActivityRollup(models.Model):
+    """Сводка ответов за час или день по материалу; без материала - по курсу"""
+
+    class Period(models.TextChoices):
+        HOUR = "hour", "час"
+        DAY = "day", "день"
+
+    period = models.CharField(max_length=4, choices=Period.choices, verbose_name="период")
+    bucket_start = models.DateTimeField(verbose_name="начало периода")
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="курс")
+    material = models.ForeignKey(
+        Material, on_delete=models.CASCADE, **NULLABLE, verbose_name="обучающий материал"
+    )
+    answers_count = models.PositiveIntegerField(default=0, verbose_name="ответов")
+    correct_answers_count = models.PositiveIntegerField(
+        default=0, verbose_name="правильных ответов"
+    )
+    active_students = models.PositiveIntegerField(default=0, verbose_name="активных студентов")
+
+    def __str__(self):
+        return f"{self.course} - {self.period} {self.bucket_start}"
+
+    class Meta:
+        verbose_name = "Сводка активности"
+        verbose_name_plural = "Сводки активности"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "bucket_start", "material"],
+                condition=models.Q(material__isnull=False),
+                name="activity_rollup_material_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["period", "bucket_start", "course"],
+                condition=models.Q(material__isnull=True),
+                name="activity_rollup_course_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["course", "period", "bucket_start"], name="activity_rollup_course_idx"
+            ),
+        ]
+
+
+class RollupCheckpoint(models.Model):
+    """Отметка, до которой ответы уже учтены в сводках"""
+
+    name = models.CharField(max_length=50, unique=True, verbose_name="название")
+    high_water_mark = models.DateTimeField(**NULLABLE, verbose_name="учтено до")
+
+    def __str__(self):
+        return f"{self.name}: {self.high_water_mark}"
+
+    class Meta:
+        verbose_name = "Отметка сводки"
+        verbose_name_plural = "Отметки сводок"
+
+
+class TestItemStatistics(models.Model):
+    """Психометрические показатели теста по первым попыткам студентов"""
+
+    test = models.OneToOneField(
+        Test, on_delete=models.CASCADE, related_name="item_statistics", verbose_name="тест"
+    )
+    students_count = models.PositiveIntegerField(default=0, verbose_name="ответивших студентов")
+    difficulty = models.FloatField(**NULLABLE, verbose_name="доля правильных ответов")
+    discrimination = models.FloatField(**NULLABLE, verbose_name="индекс дискриминации")
+    point_biserial = models.FloatField(**NULLABLE, verbose_name="точечно-бисериальная корреляция")
+    # id варианта ответа (или "other") -> доля студентов, выбравших его
+    option_shares = models.JSONField(default=dict, verbose_name="доли вариантов ответа")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="рассчитано")
+
+    def __str__(self):
+        return f"{self.test}"
+
+    class Meta:
+        verbose_name = "Статистика теста"
+        verbose_name_plural = "Статистика тестов"
+
+
+class AnswerArchiveSegment(models.Model):
+    """Файл архива ответов студентов (NDJSON, сжатый gzip) по курсу"""
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="курс")
+    path = models.CharField(max_length=255, unique=True, verbose_name="путь к файлу")
+    first_answer_id = models.PositiveBigIntegerField(verbose_name="первый ответ")
+    last_answer_id = models.PositiveBigIntegerField(verbose_name="последний ответ")
+    oldest_timestamp = models.DateTimeField(verbose_name="самый ранний ответ")
+    newest_timestamp = models.DateTimeField(verbose_name="самый поздний ответ")
+    answers_count = models.PositiveIntegerField(verbose_name="ответов")
+    size_bytes = models.PositiveBigIntegerField(verbose_name="размер файла")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="создан")
+
+    def __str__(self):
+        return self.path
+
+    class Meta:
+        verbose_name = "Архив ответов"
+        verbose_name_plural = "Архивы ответов"
+        indexes = [
+            models.Index(fields=["course", "first_answer_id"], name="archive_segment_course_idx"),
+        ]
+
+
+class PendingCourseUpdate(models.Model):
+    """Изменение материала, еще не разосланное подписчикам курса.
+
+    На материал приходится одна строка; письмо-сводка по курсу уходит,
+    когда материалы курса перестают меняться.
+    """
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="курс")
+    material = models.OneToOneField(Material, on_delete=models.CASCADE, verbose_name="материал")
+    first_changed_at = models.DateTimeField(verbose_name="первое изменение")
+    changed_at = models.DateTimeField(verbose_name="последнее изменение")
+
+    def __str__(self):
+        return f"{self.course} - {self.material}"
+
+    class Meta:
+        verbose_name = "Неразосланное изменение"
+        verbose_name_plural = "Неразосланные изменения"
+        indexes = [
+            models.Index(fields=["course", "changed_at"], name="pending_update_course_idx"),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """Задача Celery, записанная в транзакции запроса и еще не отправленная брокеру"""
+
+    task = models.CharField(max_length=255, verbose_name="задача")
+    args = models.JSONField(default=list, verbose_name="аргументы")
+    kwargs = models.JSONField(default=dict, verbose_name="именованные аргументы")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="создана")
+
+    def __str__(self):
+        return self.task
+
+    class Meta:
+        verbose_name = "Задача в исходящей очереди"
+        verbose_name_plural = "Исходящая очередь задач"
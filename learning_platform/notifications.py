@@ -0,0 +1,136 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection, send_mass_mail
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from learning_platform.models import Course, PendingCourseUpdate
+from users.models import Subscription
+
+
+def update_notification(course_title, material_titles=()):
+    """Тема и текст письма об обновлении курса"""
+    subject = f"Обновление курса: {course_title}"
+    message = f'Уважаемый пользователь,\n\nКурс "{course_title}" был обновлен. Пожалуйста, проверьте новые материалы.'
+    if material_titles:
+        message += "\n\nОбновленные материалы:\n" + "\n".join(
+            f"- {title}" for title in material_titles
+        )
+    return subject, message
+
+
+def send_course_notification(course_id, material_titles=()):
+    """Рассылка письма об обновлении курса всем подписчикам.
+
+    Адреса читаются из БД потоком и отправляются пачками по
+    NOTIFICATION_BATCH_SIZE писем через одно SMTP-соединение.
+    Возвращает число отправленных писем.
+    """
+    course_title = Course.objects.filter(pk=course_id).values_list("title", flat=True).first()
+    if course_title is None:
+        return 0
+    subject, message = update_notification(course_title, material_titles)
+    batch_size = settings.NOTIFICATION_BATCH_SIZE
+    emails = (
+        Subscription.objects.filter(course_id=course_id, is_subscribed=True)
+        .order_by()
+        .values_list("user__email", flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+
+    sent = 0
+    connection = get_connection()
+    connection.open()
+    try:
+        while batch := list(islice(emails, batch_size)):
+            sent += send_mass_mail(
+                [(subject, message, settings.EMAIL_HOST_USER, [email]) for email in batch],
+                connection=connection,
+            )
+    finally:
+        connection.close()
+    return sent
+
+
+def record_course_update(material):
+    """Запоминает изменение материала для будущего письма-сводки.
+
+    На каждый материал хранится одна строка: повторные изменения только
+    сдвигают время последнего изменения.
+    """
+    now = timezone.now()
+    PendingCourseUpdate.objects.bulk_create(
+        [
+            PendingCourseUpdate(
+                course_id=material.course_id,
+                material=material,
+                first_changed_at=now,
+                changed_at=now,
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=["material"],
+        update_fields=["course", "changed_at"],
+    )
+
+
+def due_course_ids(now=None):
+    """Курсы, изменения которых пора разослать: материалы не менялись
+    NOTIFICATION_QUIET_PERIOD или первое изменение ждет дольше
+    NOTIFICATION_MAX_DELAY"""
+    now = now or timezone.now()
+    return (
+        PendingCourseUpdate.objects.values("course_id")
+        .annotate(last_change=Max("changed_at"), first_change=Min("first_changed_at"))
+        .filter(
+            Q(last_change__lte=now - settings.NOTIFICATION_QUIET_PERIOD)
+            | Q(first_change__lte=now - settings.NOTIFICATION_MAX_DELAY)
+        )
+        .order_by("course_id")
+        .values_list("course_id", flat=True)
+    )
+
+
+def digest_lock_key(course_id):
+    return f"learning_platform:digest_lock:{course_id}"
+
+
+def flush_course_updates(now=None):
+    """Отправляет подписчикам по одному письму-сводке на курс.
+
+    Курс захватывается блокировкой в кэше (cache.add) до чтения строк:
+    если предыдущий запуск задачи еще рассылает сводку, курс пропускается,
+    и подписчики не получают письмо дважды. Блокировка живет не дольше
+    ограничения времени задач очереди email. Строки удаляются после
+    рассылки, причем только если материал не менялся во время нее: такие
+    изменения уйдут следующим письмом. Возвращает число отправленных писем.
+    """
+    lock_timeout = settings.CELERY_WORKER_QUEUES["email"]["time_limit"]
+    sent = 0
+    for course_id in list(due_course_ids(now)):
+        lock_key = digest_lock_key(course_id)
+        if not cache.add(lock_key, 1, lock_timeout):
+            continue
+        try:
+            read_at = now or timezone.now()
+            pending = list(
+                PendingCourseUpdate.objects.filter(course_id=course_id)
+                .order_by("material__title")
+                .values_list("id", "material__title", "changed_at")
+            )
+            if not pending:
+                continue
+            sent += send_course_notification(course_id, [title for _, title, _ in pending])
+            pending_ids = [pk for pk, _, _ in pending]
+            PendingCourseUpdate.objects.filter(
+                id__in=pending_ids,
+                changed_at__lte=max(changed_at for _, _, changed_at in pending),
+            ).delete()
+            # Изменения, сделанные во время рассылки, ждут новой паузы: отсчет
+            # максимальной задержки для них начинается с чтения сводки
+            PendingCourseUpdate.objects.filter(id__in=pending_ids).update(first_changed_at=read_at)
+        finally:
+            cache.delete(lock_key)
+    return sent
@@ -0,0 +1,50 @@
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+
+from learning_platform.models import OutboxMessage
+
+
+def enqueue(task, *args, **kwargs):
+    """Записывает задачу в исходящую очередь в текущей транзакции.
+
+    Задача попадет к брокеру, только если транзакция закоммитится;
+    сам запрос с брокером не связывается.
+    """
+    return OutboxMessage.objects.create(task=task.name, args=list(args), kwargs=kwargs)
+
+
+def dispatch_batch(batch_size=None):
+    """Публикует одну пачку задач из исходящей очереди.
+
+    Строки блокируются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    несколько диспетчеров не отправляют одни и те же задачи. Пачка
+    публикуется через одно соединение с брокером и удаляется в той же
+    транзакции; при сбое до коммита задачи будут отправлены повторно.
+    Возвращает число отправленных задач.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", "task", "args", "kwargs")[:batch_size]
+        )
+        if not messages:
+            return 0
+        with current_app.producer_or_acquire() as producer:
+            for _, task, args, kwargs in messages:
+                current_app.send_task(task, args=args, kwargs=kwargs, producer=producer)
+        OutboxMessage.objects.filter(id__in=[message[0] for message in messages]).delete()
+    return len(messages)
+
+
+def dispatch_outbox(batch_size=None):
+    """Публикует задачи из исходящей очереди, пока она не опустеет"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    dispatched = 0
+    while True:
+        count = dispatch_batch(batch_size)
+        dispatched += count
+        if count < batch_size:
+            return dispatched
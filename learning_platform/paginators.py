@@ -1,4 +1,13 @@
-from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
@@ -14,3 +23,101 @@ class CustomOffsetPagination(LimitOffsetPagination):
 
 class StudentAnswerPagination(PageNumberPagination):
     page_size = 10
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу сортировки.
+
+    Курсор хранит значения полей ordering последней строки страницы,
+    следующая страница выбирается условием "строго больше" по этим полям,
+    поэтому стоимость запроса не зависит от номера страницы.
+    """
+
+    ordering = ("id",)
+    page_size = 10
+    max_page_size = 20
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(self.position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Лишняя строка показывает, есть ли следующая страница
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[: self.page_size]
+        self.next_position = self.get_position(results[-1]) if self.has_next else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position(self, obj):
+        return [getattr(obj, field) for field in self.ordering]
+
+    def get_position_filter(self, position):
+        """Условие (f1, f2, ...) > (v1, v2, ...) в лексикографическом порядке"""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            equal = {name: value for name, value in zip(self.ordering[:index], position)}
+            condition |= Q(**equal, **{f"{field}__gt": position[index]})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class TestKeysetPagination(KeysetPagination):
+    ordering = ("material_id", "id")
+
+
+class CourseKeysetPagination(KeysetPagination):
+    ordering = ("id",)
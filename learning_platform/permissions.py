@@ -1,26 +1,22 @@
 from rest_framework import permissions
 
+from users.roles import is_student, is_teacher
+
 
 class IsStudent(permissions.BasePermission):
     def has_permission(self, request, view):
         # Разрешить доступ, если пользователь аутентифицирован и является студентом
-        return (
-            request.user.is_authenticated
-            and request.user.groups.filter(name="Студенты").exists()
-        )
+        return is_student(request.user)
 
 
 class IsTeacher(permissions.BasePermission):
     def has_permission(self, request, view):
         # Разрешить доступ, если пользователь аутентифицирован и является преподавателем
-        return (
-            request.user.is_authenticated
-            and request.user.groups.filter(name="Преподаватели").exists()
-        )
+        return is_teacher(request.user)
 
     def has_object_permission(self, request, view, obj):
         # Преподаватели могут управлять любым тестом
-        if request.user.groups.filter(name="Преподаватели").exists():
+        if is_teacher(request.user):
             return True
         # Студенты могут только просматривать тесты
         return obj.owner == request.user
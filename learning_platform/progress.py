@@ -0,0 +1,201 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from learning_platform.archive import archived_course_ids
+from learning_platform.leaderboard import leaderboard
+from learning_platform.models import MaterialProgress, StudentAnswer, StudentProgress, Test
+
+COUNTERS = (
+    "answers_count",
+    "correct_answers_count",
+    "attempted_tests",
+    "completed_tests",
+    "first_attempt_correct_tests",
+)
+
+
+def test_materials(test_ids):
+    """test_id -> (material_id, course_id)"""
+    return {
+        test_id: (material_id, course_id)
+        for test_id, material_id, course_id in Test.objects.filter(id__in=test_ids).values_list(
+            "id", "material_id", "material__course_id"
+        )
+    }
+
+
+def count_progress(answers, materials):
+    """Приращения счетчиков прогресса по новым проверенным ответам.
+
+    Возвращает словарь (student_id, course_id, material_id) -> счетчики.
+    Тест считается начатым при первом ответе студента и пройденным при
+    первом правильном ответе, поэтому учитываются ранее сохраненные ответы.
+    Первой попыткой считается проверенный ответ с наименьшим id.
+    materials - результат test_materials для тестов ответов.
+    """
+    test_ids = {answer.test_id for answer in answers}
+    student_ids = {answer.student_id for answer in answers}
+    previous = (
+        StudentAnswer.objects.filter(
+            student_id__in=student_ids,
+            test_id__in=test_ids,
+            grading_status=StudentAnswer.GradingStatus.GRADED,
+        )
+        .exclude(id__in=[answer.id for answer in answers])
+        .values_list("student_id", "test_id", "is_correct")
+        .distinct()
+    )
+    attempted = set()
+    completed = set()
+    for student_id, test_id, is_correct in previous:
+        attempted.add((student_id, test_id))
+        if is_correct:
+            completed.add((student_id, test_id))
+
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for answer in sorted(answers, key=lambda answer: answer.id):
+        material_id, course_id = materials[answer.test_id]
+        delta = deltas[(answer.student_id, course_id, material_id)]
+        pair = (answer.student_id, answer.test_id)
+        delta["answers_count"] += 1
+        if pair not in attempted:
+            attempted.add(pair)
+            delta["attempted_tests"] += 1
+            if answer.is_correct:
+                delta["first_attempt_correct_tests"] += 1
+        if answer.is_correct:
+            delta["correct_answers_count"] += 1
+            if pair not in completed:
+                completed.add(pair)
+                delta["completed_tests"] += 1
+    return deltas
+
+
+def apply_increments(queryset, delta, **fields):
+    fields.update({name: F(name) + value for name, value in delta.items() if value})
+    queryset.update(**fields)
+
+
+def record_graded_answers(answers):
+    """Учитывает проверенные ответы в таблицах прогресса.
+
+    Строки прогресса курса создаются и блокируются одним запросом (в порядке
+    студент, курс) до чтения прежних ответов: параллельные запросы и воркеры
+    проверки с ответами того же студента по тому же курсу считают приращения
+    по очереди и не засчитывают один тест дважды. Счетчики увеличиваются
+    F-выражениями. После коммита обновляются очки студентов в рейтинге курса.
+    """
+    if not answers:
+        return
+    materials = test_materials({answer.test_id for answer in answers})
+    pairs = sorted({(answer.student_id, materials[answer.test_id][1]) for answer in answers})
+
+    with transaction.atomic(savepoint=False):
+        # INSERT ... ON CONFLICT DO UPDATE блокирует и новые, и существующие строки
+        StudentProgress.objects.bulk_create(
+            [
+                StudentProgress(student_id=student_id, course_id=course_id)
+                for student_id, course_id in pairs
+            ],
+            update_conflicts=True,
+            unique_fields=["student", "course"],
+            update_fields=["updated_at"],
+        )
+
+        deltas = count_progress(answers, materials)
+        course_deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        for (student_id, course_id, material_id), delta in deltas.items():
+            for name, value in delta.items():
+                course_deltas[(student_id, course_id)][name] += value
+
+        MaterialProgress.objects.bulk_create(
+            [
+                MaterialProgress(student_id=student_id, course_id=course_id, material_id=material_id)
+                for student_id, course_id, material_id in deltas
+            ],
+            ignore_conflicts=True,
+        )
+        for (student_id, course_id), delta in course_deltas.items():
+            apply_increments(
+                StudentProgress.objects.filter(student_id=student_id, course_id=course_id),
+                delta,
+                updated_at=timezone.now(),
+            )
+        for (student_id, course_id, material_id), delta in deltas.items():
+            apply_increments(
+                MaterialProgress.objects.filter(student_id=student_id, material_id=material_id),
+                delta,
+            )
+        # Рейтинг читает закоммиченный прогресс
+        transaction.on_commit(lambda: leaderboard.refresh(pairs))
+
+
+def bulk_create_in_batches(model, objs, batch_size):
+    """bulk_create для генератора: в памяти не больше batch_size объектов"""
+    objs = iter(objs)
+    while batch := list(islice(objs, batch_size)):
+        model.objects.bulk_create(batch)
+
+
+def rebuild_progress(batch_size=1000):
+    """Пересчитывает таблицы прогресса по всем проверенным ответам.
+
+    Курсы, ответы которых частично перенесены в архив, не пересчитываются:
+    их прогресс сохраняется в том виде, в котором был до архивации.
+    """
+    archived = archived_course_ids()
+    answers = (
+        StudentAnswer.objects.filter(grading_status=StudentAnswer.GradingStatus.GRADED)
+        .exclude(test__material__course_id__in=archived)
+        .order_by()
+    )
+    first_attempts = (
+        answers.values("student_id", "test_id").annotate(first_id=Min("id")).values("first_id")
+    )
+    counters = {
+        "answers_count": Count("id"),
+        "correct_answers_count": Count("id", filter=Q(is_correct=True)),
+        "attempted_tests": Count("test_id", distinct=True),
+        "completed_tests": Count("test_id", distinct=True, filter=Q(is_correct=True)),
+        "first_attempt_correct_tests": Count(
+            "id", filter=Q(is_correct=True, id__in=first_attempts)
+        ),
+    }
+    by_material = answers.values(
+        "student_id", "test__material_id", "test__material__course_id"
+    ).annotate(**counters)
+    by_course = answers.values("student_id", "test__material__course_id").annotate(**counters)
+
+    with transaction.atomic():
+        MaterialProgress.objects.exclude(course_id__in=archived).delete()
+        StudentProgress.objects.exclude(course_id__in=archived).delete()
+        bulk_create_in_batches(
+            MaterialProgress,
+            (
+                MaterialProgress(
+                    student_id=row["student_id"],
+                    course_id=row["test__material__course_id"],
+                    material_id=row["test__material_id"],
+                    **{name: row[name] for name in COUNTERS},
+                )
+                for row in by_material.iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+        bulk_create_in_batches(
+            StudentProgress,
+            (
+                StudentProgress(
+                    student_id=row["student_id"],
+                    course_id=row["test__material__course_id"],
+                    **{name: row[name] for name in COUNTERS},
+                )
+                for row in by_course.iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+    return StudentProgress.objects.count()
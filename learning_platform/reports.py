@@ -0,0 +1,136 @@
+from django.db import connection
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from learning_platform.models import StudentAnswer
+from learning_platform.streaming import STREAM_CHUNK_SIZE, iter_csv, iter_ndjson
+
+GRADEBOOK_COLUMNS = (
+    "student_id",
+    "student_email",
+    "test_id",
+    "question",
+    "selected_answer",
+    "is_correct",
+    "timestamp",
+)
+
+# Формат выгрузки -> (функция записи, content type, расширение файла)
+GRADEBOOK_FORMATS = {
+    "csv": (iter_csv, "text/csv", "csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+}
+
+
+def latest_attempts(answers):
+    """Только последние проверенные попытки студентов по каждому тесту из answers.
+
+    Непроверенные ответы отбрасываются до выбора последней попытки: иначе
+    ожидающая проверки попытка скрывала бы предыдущую проверенную.
+    В PostgreSQL последняя попытка выбирается через DISTINCT ON (test_id,
+    student_id), в остальных БД - коррелированным подзапросом. Оба плана
+    используют индекс (test, student, -timestamp, -id). Возвращается
+    обычный queryset, к которому можно применять сортировку и группировку.
+    """
+    answers = answers.filter(grading_status=StudentAnswer.GradingStatus.GRADED)
+    if connection.vendor == "postgresql":
+        latest_ids = (
+            answers.order_by("test_id", "student_id", "-timestamp", "-id")
+            .distinct("test_id", "student_id")
+            .values("id")
+        )
+        return StudentAnswer.objects.filter(id__in=latest_ids)
+
+    latest_id = (
+        StudentAnswer.objects.filter(
+            test_id=OuterRef("test_id"),
+            student_id=OuterRef("student_id"),
+            grading_status=StudentAnswer.GradingStatus.GRADED,
+        )
+        .order_by("-timestamp", "-id")
+        .values("id")[:1]
+    )
+    return answers.filter(id=Subquery(latest_id))
+
+
+def with_percent(row):
+    row["percent"] = round(100 * row["correct"] / row["total"], 2) if row["total"] else 0
+    return row
+
+
+def answer_summary(answers):
+    """Итоги по ответам: число правильных и всех ответов по студентам и тестам.
+
+    Подсчет выполняется в БД группировкой, поэтому размер результата
+    зависит от числа студентов и тестов, а не от числа ответов.
+    Непроверенные ответы не учитываются.
+    """
+    answers = answers.filter(grading_status=StudentAnswer.GradingStatus.GRADED).order_by()
+    totals = {
+        "total": Count("id"),
+        "correct": Count("id", filter=Q(is_correct=True)),
+    }
+    students = (
+        answers.values("student_id", "student__email").annotate(**totals).order_by("student_id")
+    )
+    tests = answers.values("test_id", "test__question").annotate(**totals).order_by("test_id")
+    return {
+        "students": [
+            with_percent(
+                {
+                    "student": row["student_id"],
+                    "email": row["student__email"],
+                    "correct": row["correct"],
+                    "total": row["total"],
+                }
+            )
+            for row in students
+        ],
+        "tests": [
+            with_percent(
+                {
+                    "test": row["test_id"],
+                    "question": row["test__question"],
+                    "correct": row["correct"],
+                    "total": row["total"],
+                }
+            )
+            for row in tests
+        ],
+    }
+
+
+def gradebook_rows(course_id, chunk_size=STREAM_CHUNK_SIZE):
+    """Проверенные ответы студентов по курсу в порядке (тест, студент, время).
+    Ответы, ожидающие проверки (GRADING_ASYNC), не выгружаются.
+
+    Тест и студент берутся в порядке индекса studentanswer_latest_idx, а
+    попытки одного студента PostgreSQL досортировывает инкрементально,
+    без сортировки всей выборки.
+
+    Строки читаются через iterator(), который в PostgreSQL использует
+    курсор на стороне сервера, и сразу превращаются в кортежи без
+    создания объектов моделей.
+    """
+    return (
+        StudentAnswer.objects.filter(
+            test__material__course_id=course_id,
+            grading_status=StudentAnswer.GradingStatus.GRADED,
+        )
+        .order_by("test_id", "student_id", "timestamp")
+        .values_list(
+            "student_id",
+            "student__email",
+            "test_id",
+            "test__question",
+            "selected_answer",
+            "is_correct",
+            "timestamp",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def iter_gradebook(course_id, file_format):
+    """Выгрузка ведомости курса частями в формате csv или ndjson"""
+    writer = GRADEBOOK_FORMATS[file_format][0]
+    return writer(gradebook_rows(course_id), GRADEBOOK_COLUMNS)
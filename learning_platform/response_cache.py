@@ -0,0 +1,140 @@
+import hashlib
+import time
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+RESPONSE_CACHE_LOCK_TIMEOUT = 30
+# Сколько ждать чужой пересборки, если устаревшей копии нет
+RESPONSE_CACHE_WAIT = 2
+RESPONSE_CACHE_POLL_INTERVAL = 0.05
+
+
+def generation_key(scope):
+    return f"learning_platform:response_cache:generation:{scope}"
+
+
+def get_generation(scope):
+    generation = cache.get(generation_key(scope))
+    if generation is None:
+        cache.add(generation_key(scope), uuid.uuid4().hex, None)
+        generation = cache.get(generation_key(scope))
+    return generation
+
+
+def bump_generation(*scopes):
+    cache.set_many({generation_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+
+
+def invalidate_response_cache(*scopes):
+    """Помечает закэшированные ответы областей устаревшими сейчас и после коммита"""
+    bump_generation(*scopes)
+    transaction.on_commit(lambda: bump_generation(*scopes))
+
+
+def response_cache_rule(request):
+    """Правило кэширования для анонимного GET-запроса или None"""
+    if request.method != "GET":
+        return None
+    if "HTTP_AUTHORIZATION" in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return None
+    for prefix, rule in settings.RESPONSE_CACHE_RULES.items():
+        if request.path.startswith(prefix):
+            return rule
+    return None
+
+
+def response_cache_key(request):
+    """Ключ по адресу с упорядоченными параметрами и заголовку Accept"""
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = request.build_absolute_uri(f"{request.path}?{query}" if query else request.path)
+    source = "|".join([url, request.META.get("HTTP_ACCEPT", "")])
+    return f"learning_platform:response_cache:{hashlib.sha256(source.encode()).hexdigest()}"
+
+
+def is_cacheable(response):
+    cache_control = response.get("Cache-Control", "")
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and "private" not in cache_control
+        and "no-store" not in cache_control
+    )
+
+
+def make_entry(response, generation, rule):
+    return {
+        "generation": generation,
+        "fresh_until": time.time() + rule["soft_ttl"],
+        "status": response.status_code,
+        "headers": list(response.items()),
+        "content": response.content,
+    }
+
+
+def cached_response(entry, request, state):
+    headers = dict(entry["headers"])
+    etag = headers.get("ETag")
+    if etag and etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified(headers={"ETag": etag})
+    else:
+        response = HttpResponse(entry["content"], status=entry["status"], headers=headers)
+    response["X-Cache"] = state
+    return response
+
+
+class AnonymousResponseCacheMiddleware:
+    """Кэш ответов на анонимные GET-запросы к адресам из RESPONSE_CACHE_RULES.
+
+    Запись свежая soft_ttl секунд и хранится ttl секунд. Устаревшую или
+    сброшенную сменой поколения области запись пересобирает один процесс,
+    захвативший блокировку, остальные в это время получают устаревшую копию.
+    Поколения областей меняются сигналами при изменении данных.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rule = response_cache_rule(request)
+        if rule is None:
+            return self.get_response(request)
+
+        key = response_cache_key(request)
+        generation = get_generation(rule["scope"])
+        entry = cache.get(key)
+        if (
+            entry is not None
+            and entry["generation"] == generation
+            and entry["fresh_until"] > time.time()
+        ):
+            return cached_response(entry, request, "HIT")
+
+        lock_key = f"{key}:lock"
+        if cache.add(lock_key, 1, RESPONSE_CACHE_LOCK_TIMEOUT):
+            try:
+                response = self.get_response(request)
+                if is_cacheable(response):
+                    cache.set(key, make_entry(response, generation, rule), rule["ttl"])
+            finally:
+                cache.delete(lock_key)
+            response["X-Cache"] = "MISS"
+            return response
+
+        if entry is not None:
+            return cached_response(entry, request, "STALE")
+
+        # Копии нет совсем: ждем, пока запись соберет процесс с блокировкой
+        deadline = time.monotonic() + RESPONSE_CACHE_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(RESPONSE_CACHE_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return cached_response(entry, request, "HIT")
+        return self.get_response(request)
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from learning_platform.models import AnswerActivityRollup, RollupCheckpoint, StudentAnswer
+
+ACTIVITY_CHECKPOINT = "answer_activity"
+# Ответы, сохраненные в еще не закоммиченных транзакциях, получают время
+# раньше коммита; отступ не дает отметке их обогнать
+ROLLUP_LAG = timedelta(minutes=1)
+ROLLUP_PERIODS = (AnswerActivityRollup.Period.HOUR, AnswerActivityRollup.Period.DAY)
+
+
+def rollup_window_end(now=None):
+    """Граница новой отметки: не позже самого старого непроверенного ответа"""
+    end = (now or timezone.now()) - ROLLUP_LAG
+    oldest_pending = (
+        StudentAnswer.objects.filter(grading_status=StudentAnswer.GradingStatus.PENDING)
+        .order_by("id")
+        .values_list("timestamp", flat=True)
+        .first()
+    )
+    if oldest_pending is not None:
+        end = min(end, oldest_pending)
+    return end
+
+
+def bucket_start(period, moment):
+    moment = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+    if period == AnswerActivityRollup.Period.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def aggregate_activity(period, start, end):
+    """Сводки за период по ответам с start до end, по материалам и по курсам"""
+    answers = (
+        StudentAnswer.objects.filter(
+            timestamp__gte=start,
+            timestamp__lt=end,
+            grading_status=StudentAnswer.GradingStatus.GRADED,
+        )
+        .annotate(
+            bucket=Trunc("timestamp", period),
+            course_id=F("test__material__course_id"),
+            material_id=F("test__material_id"),
+        )
+        .order_by()
+    )
+    counters = {
+        "answers_count": Count("id"),
+        "correct_answers_count": Count("id", filter=Q(is_correct=True)),
+        "active_students": Count("student_id", distinct=True),
+    }
+    for fields in (("bucket", "course_id", "material_id"), ("bucket", "course_id")):
+        for row in answers.values(*fields).annotate(**counters).iterator():
+            yield AnswerActivityRollup(
+                period=period,
+                bucket_start=row.pop("bucket"),
+                course_id=row.pop("course_id"),
+                material_id=row.pop("material_id", None),
+                **row,
+            )
+
+
+def rollup_answer_activity(now=None, batch_size=1000):
+    """Обновляет часовые и дневные сводки по ответам после отметки.
+
+    Число активных студентов нельзя получить сложением, поэтому периоды,
+    в которые попали новые ответы, пересчитываются целиком и заменяются.
+    Отметка сдвигается не дальше самого старого непроверенного ответа.
+    Возвращает число записанных строк сводок.
+    """
+    with transaction.atomic():
+        checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(
+            name=ACTIVITY_CHECKPOINT
+        )
+        start = checkpoint.high_water_mark
+        end = rollup_window_end(now)
+        if start is None:
+            start = StudentAnswer.objects.order_by("timestamp").values_list(
+                "timestamp", flat=True
+            ).first()
+        if start is None or start >= end:
+            return 0
+
+        written = 0
+        if StudentAnswer.objects.filter(timestamp__gte=start, timestamp__lt=end).exists():
+            for period in ROLLUP_PERIODS:
+                period_start = bucket_start(period, start)
+                AnswerActivityRollup.objects.filter(
+                    period=period, bucket_start__gte=period_start
+                ).delete()
+                rows = AnswerActivityRollup.objects.bulk_create(
+                    aggregate_activity(period, period_start, end), batch_size=batch_size
+                )
+                written += len(rows)
+
+        checkpoint.high_water_mark = end
+        checkpoint.save(update_fields=["high_water_mark"])
+    return written
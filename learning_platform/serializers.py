@@ -1,7 +1,16 @@
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
-from learning_platform.models import AnswerOption, Course, Material, StudentAnswer, Test
+from learning_platform.models import (
+    AnswerActivityRollup,
+    AnswerOption,
+    Course,
+    Material,
+    MaterialProgress,
+    StudentAnswer,
+    StudentProgress,
+    Test,
+)
 from learning_platform.validators import NoExternalLinksValidator
 
 
@@ -44,6 +53,74 @@ class StudentAnswerListSerializer(serializers.ListSerializer):
 class StudentAnswerSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudentAnswer
-        fields = ["id", "student", "test", "selected_answer", "is_correct", "timestamp"]
-        read_only_fields = ["student", "is_correct"]
+        fields = [
+            "id",
+            "student",
+            "test",
+            "selected_answer",
+            "is_correct",
+            "grading_status",
+            "timestamp",
+        ]
+        read_only_fields = ["student", "is_correct", "grading_status"]
         list_serializer_class = StudentAnswerListSerializer
+
+
+class StudentAnswerSubmitItemSerializer(serializers.Serializer):
+    test = serializers.IntegerField()
+    selected_answer = serializers.CharField(max_length=255)
+
+
+class StudentAnswerBulkSerializer(serializers.Serializer):
+    """Ответы на несколько тестов, отправленные одним запросом"""
+
+    answers = StudentAnswerSubmitItemSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_answers(self, answers):
+        test_ids = {answer["test"] for answer in answers}
+        existing = set(Test.objects.filter(id__in=test_ids).values_list("id", flat=True))
+        missing = sorted(test_ids - existing)
+        if missing:
+            raise serializers.ValidationError(f"Тесты не найдены: {missing}")
+        return answers
+
+
+class MaterialProgressSerializer(ModelSerializer):
+    class Meta:
+        model = MaterialProgress
+        fields = [
+            "material",
+            "answers_count",
+            "correct_answers_count",
+            "attempted_tests",
+            "completed_tests",
+            "first_attempt_correct_tests",
+        ]
+
+
+class StudentProgressSerializer(ModelSerializer):
+    class Meta:
+        model = StudentProgress
+        fields = [
+            "student",
+            "course",
+            "answers_count",
+            "correct_answers_count",
+            "attempted_tests",
+            "completed_tests",
+            "first_attempt_correct_tests",
+            "updated_at",
+        ]
+
+
+class AnswerActivityRollupSerializer(ModelSerializer):
+    class Meta:
+        model = AnswerActivityRollup
+        fields = [
+            "period",
+            "bucket_start",
+            "material",
+            "answers_count",
+            "correct_answers_count",
+            "active_students",
+        ]
@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from learning_platform.bundles import forget_course_bundle
+from learning_platform.catalog import invalidate_catalog
+from learning_platform.grading import forget_answer_keys
+from learning_platform.leaderboard import leaderboard
+from learning_platform.models import AnswerOption, Course, Material, Test
+from learning_platform.outbox import enqueue
+from learning_platform.response_cache import invalidate_response_cache
+from learning_platform.subscriptions import subscription_index
+from learning_platform.tascs import rebuild_course_bundle
+from users.models import Subscription
+
+
+def refresh_now_and_on_commit(func, *args):
+    """Обновляет запись кэша сразу и повторно после коммита транзакции,
+    чтобы в кэше не осталось данных, прочитанных до коммита"""
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+def rebuild_bundles(*course_ids):
+    """Сбрасывает пакеты курсов и записывает задачи пересборки в исходящую очередь"""
+    course_ids = set(course_ids) - {None}
+    if not course_ids:
+        return
+    refresh_now_and_on_commit(forget_course_bundle, *course_ids)
+    for course_id in course_ids:
+        enqueue(rebuild_course_bundle, course_id)
+
+
+def course_of_material(material_id):
+    if material_id is None:
+        return None
+    return Material.objects.filter(pk=material_id).values_list("course_id", flat=True).first()
+
+
+def course_of_test(test_id):
+    return (
+        Test.objects.filter(pk=test_id).values_list("material__course_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def reset_catalog_on_course_change(sender, instance, **kwargs):
+    invalidate_catalog()
+    invalidate_response_cache("courses")
+    rebuild_bundles(instance.pk)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def refresh_subscription_index_for_user(sender, instance, **kwargs):
+    refresh_now_and_on_commit(subscription_index.refresh_user, instance.user_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def refresh_leaderboard_on_subscription_change(sender, instance, **kwargs):
+    # Подключается после обновления индекса подписок, которым пользуется рейтинг
+    pair = (instance.user_id, instance.course_id)
+    transaction.on_commit(lambda: leaderboard.refresh([pair]))
+
+
+@receiver(pre_save, sender=Material)
+def remember_material_course(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_course_id = (
+            Material.objects.filter(pk=instance.pk).values_list("course_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+def refresh_subscription_index_for_course(sender, instance, **kwargs):
+    course_ids = {instance.course_id, getattr(instance, "_previous_course_id", None)}
+    for course_id in course_ids - {None}:
+        refresh_now_and_on_commit(subscription_index.refresh_course, course_id)
+    rebuild_bundles(*course_ids)
+
+
+@receiver(pre_save, sender=AnswerOption)
+def remember_answer_option_test(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_test_id = (
+            AnswerOption.objects.filter(pk=instance.pk).values_list("test_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=AnswerOption)
+@receiver(post_delete, sender=AnswerOption)
+def reset_answer_key_on_option_change(sender, instance, **kwargs):
+    test_ids = {instance.test_id, getattr(instance, "_previous_test_id", None)} - {None}
+    refresh_now_and_on_commit(forget_answer_keys, *test_ids)
+    rebuild_bundles(*(course_of_test(test_id) for test_id in test_ids))
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def reset_answer_key_on_test_change(sender, instance, **kwargs):
+    refresh_now_and_on_commit(forget_answer_keys, instance.pk)
+    rebuild_bundles(
+        course_of_material(instance.material_id),
+        course_of_material(getattr(instance, "_previous_material_id", None)),
+    )
+
+
+@receiver(pre_save, sender=Test)
+def remember_test_material(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_material_id = (
+            Test.objects.filter(pk=instance.pk).values_list("material_id", flat=True).first()
+        )
@@ -0,0 +1,85 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 2000
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def buffered(parts, buffer_size=STREAM_BUFFER_SIZE):
+    """Склеивает мелкие части вывода в блоки размером около buffer_size"""
+    buffer = []
+    buffered_size = 0
+    for part in parts:
+        buffer.append(part)
+        buffered_size += len(part)
+        if buffered_size >= buffer_size:
+            yield "".join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_json_array(rows, serializer, buffer_size=STREAM_BUFFER_SIZE):
+    """Отдает JSON-массив частями, сериализуя строки по одной.
+
+    В памяти одновременно находится не больше одной пачки строк из БД
+    и буфер вывода размером около buffer_size.
+    """
+    encoder = JSONEncoder(ensure_ascii=False)
+
+    def parts():
+        yield "["
+        separator = ""
+        for row in rows:
+            yield separator + encoder.encode(serializer.to_representation(row))
+            separator = ","
+        yield "]"
+
+    return buffered(parts(), buffer_size)
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает записанную строку"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, header, buffer_size=STREAM_BUFFER_SIZE):
+    """Отдает CSV частями: строка заголовка и строки rows"""
+    writer = csv.writer(Echo())
+
+    def parts():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    return buffered(parts(), buffer_size)
+
+
+def iter_ndjson(rows, header, buffer_size=STREAM_BUFFER_SIZE):
+    """Отдает NDJSON частями: по одному объекту с ключами header на строку"""
+    encoder = JSONEncoder(ensure_ascii=False)
+    return buffered(
+        (encoder.encode(dict(zip(header, row))) + "\n" for row in rows), buffer_size
+    )
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """Потоковый JSON-ответ со списком объектов queryset.
+
+    Строки читаются через queryset.iterator(chunk_size), поэтому расход
+    памяти не зависит от числа объектов. Подходит для любых списков,
+    которые выводятся без пагинации.
+    """
+
+    def __init__(
+        self, queryset, serializer_class, context=None, chunk_size=STREAM_CHUNK_SIZE, **kwargs
+    ):
+        kwargs.setdefault("content_type", "application/json")
+        serializer = serializer_class(context=context or {})
+        rows = queryset.iterator(chunk_size=chunk_size)
+        super().__init__(iter_json_array(rows, serializer), **kwargs)
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+
+from learning_platform.models import Material
+from users.models import Subscription
+
+
+class SubscriptionIndex:
+    """Индекс подписок студентов в общем кэше.
+
+    Хранит для каждого пользователя множество курсов с активной подпиской,
+    а для каждого курса - множество его материалов. Записи обновляются
+    сигналами при сохранении и удалении Subscription и Material, поэтому
+    ограничение выборки по подпискам не требует запросов к БД.
+    """
+
+    timeout = 60 * 60 * 24
+
+    @staticmethod
+    def user_key(user_id):
+        return f"learning_platform:subscriptions:user:{user_id}"
+
+    @staticmethod
+    def course_key(course_id):
+        return f"learning_platform:subscriptions:course:{course_id}"
+
+    def load_course_ids(self, user_id):
+        return list(
+            Subscription.objects.filter(user_id=user_id, is_subscribed=True).values_list(
+                "course_id", flat=True
+            )
+        )
+
+    def course_ids(self, user_id):
+        """Курсы, на которые пользователь подписан"""
+        course_ids = cache.get(self.user_key(user_id))
+        if course_ids is None:
+            course_ids = self.refresh_user(user_id)
+        return frozenset(course_ids)
+
+    def material_ids(self, user_id):
+        """Материалы курсов, на которые пользователь подписан"""
+        keys = {self.course_key(course_id): course_id for course_id in self.course_ids(user_id)}
+        cached = cache.get_many(keys)
+
+        missing = [course_id for key, course_id in keys.items() if key not in cached]
+        if missing:
+            loaded = {self.course_key(course_id): [] for course_id in missing}
+            rows = Material.objects.filter(course_id__in=missing).values_list("course_id", "id")
+            for course_id, material_id in rows:
+                loaded[self.course_key(course_id)].append(material_id)
+            cache.set_many(loaded, self.timeout)
+            cached.update(loaded)
+
+        return frozenset(
+            material_id for material_ids in cached.values() for material_id in material_ids
+        )
+
+    def refresh_user(self, user_id):
+        course_ids = self.load_course_ids(user_id)
+        cache.set(self.user_key(user_id), course_ids, self.timeout)
+        return course_ids
+
+    def refresh_course(self, course_id):
+        material_ids = list(
+            Material.objects.filter(course_id=course_id).values_list("id", flat=True)
+        )
+        cache.set(self.course_key(course_id), material_ids, self.timeout)
+        return material_ids
+
+
+subscription_index = SubscriptionIndex()
@@ -1,16 +1,71 @@
 from celery import shared_task
-from django.core.mail import send_mail
 import logging
 
 from django.conf import settings
 
+from learning_platform.archive import archive_answers
+from learning_platform.bundles import build_course_bundle
+from learning_platform.grading import grade_pending_batch
+from learning_platform.item_analysis import analyze_items
+from learning_platform.leaderboard import leaderboard
+from learning_platform.notifications import flush_course_updates as flush_pending_updates
+from learning_platform.outbox import dispatch_outbox as dispatch_outbox_messages
+from learning_platform.rollups import rollup_answer_activity
+
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
-def send_update_notification(email, course_title):
-    """Отправка на почту сообщения об обновлении курса"""
-    subject = f"Обновление курса: {course_title}"
-    message = f'Уважаемый пользователь,\n\nКурс "{course_title}" был обновлен. Пожалуйста, проверьте новые материалы.'
-    send_mail(subject, message, settings.EMAIL_HOST_USER, [email])
+def flush_course_updates():
+    """Рассылка писем-сводок по курсам, материалы которых перестали меняться"""
+    return flush_pending_updates()
+
+
+@shared_task
+def grade_pending_answers(batch_size=None):
+    """Проверка ответов, сохраненных без оценки (режим GRADING_ASYNC)"""
+    batch_size = batch_size or settings.GRADING_BATCH_SIZE
+    graded = 0
+    while True:
+        answers = grade_pending_batch(batch_size)
+        graded += len(answers)
+        if len(answers) < batch_size:
+            return graded
+
+
+@shared_task
+def rebuild_leaderboards():
+    """Полный пересчет рейтингов курсов по ответам студентов"""
+    return leaderboard.rebuild()
+
+
+@shared_task
+def rollup_activity():
+    """Обновление часовых и дневных сводок активности по новым ответам"""
+    return rollup_answer_activity()
+
+
+@shared_task
+def analyze_test_items(course_ids=None):
+    """Пересчет статистики тестов (сложность, дискриминация, доли вариантов)"""
+    return analyze_items(course_ids)
+
+
+@shared_task
+def archive_old_answers():
+    """Перенос старых ответов завершенных курсов в файлы архива"""
+    return archive_answers()
+
+
+@shared_task
+def rebuild_course_bundle(course_id):
+    """Пересборка пакета содержимого курса после изменения материалов и тестов"""
+    bundle = build_course_bundle(course_id)
+    return bundle and bundle["etag"]
+
+
+@shared_task
+def dispatch_outbox():
+    """Отправка брокеру задач, накопленных в исходящей очереди"""
+    return dispatch_outbox_messages()
@@ -1,9 +1,71 @@
+import gzip
+import json
+import os
+import re
+import runpy
+import smtplib
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import numpy as np
+
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import Group
-from .models import Course, Material, Test, AnswerOption
+from .models import (
+    AnswerActivityRollup,
+    AnswerArchiveSegment,
+    AnswerOption,
+    Course,
+    Material,
+    MaterialProgress,
+    OutboxMessage,
+    PendingCourseUpdate,
+    RollupCheckpoint,
+    StudentAnswer,
+    StudentProgress,
+    Test,
+    TestItemStatistics,
+)
+from config.celery import task_queue
+from . import archive as archive_module
+from .archive import archive_answers, iter_archived_answers
+from .grading import forget_answer_keys, get_answer_keys
+from .item_analysis import analyze_items, item_statistics, load_response_matrix
+from .leaderboard import LocalLeaderboardStore, leaderboard
+from .local_smtp import LocalSMTPServer
+from .mail import pool
+from . import notifications as notifications_module
+from .notifications import flush_course_updates, send_course_notification
+from .outbox import dispatch_outbox, enqueue
+from .progress import count_progress, record_graded_answers
+from .reports import latest_attempts
+from .response_cache import response_cache_key
+from .rollups import bucket_start, rollup_answer_activity
+from .tascs import (
+    grade_pending_answers,
+    flush_course_updates as flush_course_updates_task,
+    rebuild_course_bundle,
+    rebuild_leaderboards,
+    rollup_activity,
+)
+from .subscriptions import subscription_index
+from django.conf import settings
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail import get_connection, send_mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from users.models import User
+from django.utils import timezone
+from users.models import Payment, Subscription, User
 
 
 class CourseViewSetTests(APITestCase):
@@ -207,3 +269,1514 @@ class MaterialCreateAPIViewTests(APITestCase):
         self.client.force_authenticate(user=self.student)
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestViewSetPaginationTests(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.group_teachers = Group.objects.create(name="Преподаватели")
+        self.teacher.groups.add(self.group_teachers)
+        self.client.force_authenticate(user=self.teacher)
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        self.materials = [
+            Material.objects.create(
+                title=f"Material {i}",
+                description="Material description",
+                course=self.course,
+                owner=self.teacher,
+            )
+            for i in range(2)
+        ]
+
+    def create_tests(self, count, material):
+        for i in range(count):
+            test = Test.objects.create(question=f"Question {i}", material=material, owner=self.teacher)
+            AnswerOption.objects.create(answer_text="Correct", is_correct=True, test=test)
+            AnswerOption.objects.create(answer_text="Incorrect", test=test)
+
+    def test_cursor_walks_all_tests_in_key_order(self):
+        self.create_tests(7, self.materials[1])
+        self.create_tests(7, self.materials[0])
+        url = f"{reverse('learning_platform:test-list')}?page_size=5"
+        keys = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            keys += [item["id"] for item in response.data["results"]]
+            url = response.data["next"]
+        expected = list(Test.objects.order_by("material_id", "id").values_list("id", flat=True))
+        self.assertEqual(keys, expected)
+
+    def test_queries_per_page_do_not_grow_with_tests(self):
+        url = f"{reverse('learning_platform:test-list')}?material_id={self.materials[0].id}"
+        self.create_tests(2, self.materials[0])
+        self.client.get(url)  # роли пользователя попадают в кэш
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        self.create_tests(20, self.materials[0])
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{reverse('learning_platform:test-list')}?cursor=broken")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CourseCatalogTests(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email="teacher@example.com")
+        for i in range(3):
+            Course.objects.create(
+                title=f"Course {i}",
+                description="Course description",
+                owner=self.teacher,
+                pay_amount_course=200,
+            )
+        self.url = reverse("learning_platform:course-list")
+
+    def test_catalog_is_paginated(self):
+        response = self.client.get(f"{self.url}?page_size=2")
+        self.assertEqual(len(response.data["results"]), 2)
+        response = self.client.get(response.data["next"])
+        self.assertEqual([item["title"] for item in response.data["results"]], ["Course 2"])
+        self.assertIsNone(response.data["next"])
+
+    def test_unchanged_page_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_course_change_invalidates_catalog(self):
+        etag = self.client.get(self.url)["ETag"]
+        Course.objects.filter(title="Course 0").first().delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+class CheckAnswersViewTests(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.student = User.objects.create(email="student@example.com")
+        self.group_teachers = Group.objects.create(name="Преподаватели")
+        self.group_students = Group.objects.create(name="Студенты")
+        self.teacher.groups.add(self.group_teachers)
+        self.student.groups.add(self.group_students)
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        self.material = Material.objects.create(
+            title="Test Material",
+            description="Test Material description",
+            course=self.course,
+            owner=self.teacher,
+        )
+        self.test1 = Test.objects.create(question="Test 1", material=self.material, owner=self.teacher)
+        self.test2 = Test.objects.create(question="Test 2", material=self.material, owner=self.teacher)
+        for test in (self.test1, self.test2):
+            AnswerOption.objects.create(answer_text="Correct", is_correct=True, test=test)
+            AnswerOption.objects.create(answer_text="Incorrect", test=test)
+        self.url = reverse("learning_platform:check-answers")
+
+    def answer(self, student, test, is_correct):
+        return StudentAnswer.objects.create(
+            student=student,
+            test=test,
+            selected_answer="Correct" if is_correct else "Incorrect",
+            is_correct=is_correct,
+        )
+
+    def get_json(self, response):
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_teacher_answers_are_streamed(self):
+        other = User.objects.create(email="other@example.com")
+        answers = [self.answer(self.student, self.test1, True), self.answer(other, self.test2, False)]
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(f"{self.url}?material_id={self.material.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual([item["id"] for item in self.get_json(response)], [a.id for a in answers])
+
+    def test_student_sees_only_own_answers(self):
+        other = User.objects.create(email="other@example.com")
+        own = self.answer(self.student, self.test1, True)
+        self.answer(other, self.test1, False)
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(f"{self.url}?material_id={self.material.id}")
+        self.assertEqual([item["id"] for item in self.get_json(response)], [own.id])
+
+    def test_summary_mode(self):
+        other = User.objects.create(email="other@example.com")
+        self.answer(self.student, self.test1, True)
+        self.answer(self.student, self.test2, False)
+        self.answer(other, self.test1, True)
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(f"{self.url}?material_id={self.material.id}&mode=summary")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["email"], row["correct"], row["total"], row["percent"]) for row in response.data["students"]],
+            [("student@example.com", 1, 2, 50.0), ("other@example.com", 1, 1, 100.0)],
+        )
+        self.assertEqual(
+            [(row["test"], row["correct"], row["total"]) for row in response.data["tests"]],
+            [(self.test1.id, 2, 2), (self.test2.id, 0, 1)],
+        )
+
+    def test_empty_result(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(f"{self.url}?material_id={self.material.id}")
+        self.assertEqual(self.get_json(response), [])
+
+    def test_latest_attempts_mode(self):
+        other = User.objects.create(email="other@example.com")
+        self.answer(self.student, self.test1, False)
+        latest = [self.answer(self.student, self.test1, True), self.answer(other, self.test1, False)]
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(f"{self.url}?material_id={self.material.id}&attempts=latest")
+        self.assertEqual([item["id"] for item in self.get_json(response)], [a.id for a in latest])
+
+        response = self.client.get(
+            f"{self.url}?material_id={self.material.id}&attempts=latest&mode=summary"
+        )
+        self.assertEqual(
+            [(row["test"], row["correct"], row["total"]) for row in response.data["tests"]],
+            [(self.test1.id, 1, 2)],
+        )
+
+    def test_latest_attempts_skip_pending(self):
+        graded = self.answer(self.student, self.test1, True)
+        pending = self.answer(self.student, self.test1, False)
+        StudentAnswer.objects.filter(pk=pending.pk).update(grading_status=StudentAnswer.GradingStatus.PENDING)
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(f"{self.url}?material_id={self.material.id}&attempts=latest")
+        self.assertEqual([item["id"] for item in self.get_json(response)], [graded.id])
+
+        response = self.client.get(
+            f"{self.url}?material_id={self.material.id}&attempts=latest&mode=summary"
+        )
+        self.assertEqual(
+            [(row["test"], row["correct"], row["total"]) for row in response.data["tests"]],
+            [(self.test1.id, 1, 1)],
+        )
+
+
+class SubscriptionIndexTests(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.student = User.objects.create(email="student@example.com")
+        self.group_students = Group.objects.create(name="Студенты")
+        self.student.groups.add(self.group_students)
+        self.client.force_authenticate(user=self.student)
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        self.material = Material.objects.create(
+            title="Test Material",
+            description="Test Material description",
+            course=self.course,
+            owner=self.teacher,
+        )
+        self.test1 = Test.objects.create(question="Test 1", material=self.material, owner=self.teacher)
+        self.subscription = Subscription.objects.create(
+            user=self.student, course=self.course, is_subscribed=True
+        )
+        self.url = reverse("learning_platform:test-list")
+
+    def visible_test_ids(self):
+        return [item["id"] for item in self.client.get(self.url).data["results"]]
+
+    def test_index_follows_subscription_changes(self):
+        self.assertEqual(subscription_index.course_ids(self.student.pk), {self.course.id})
+        self.assertEqual(self.visible_test_ids(), [self.test1.id])
+
+        self.subscription.is_subscribed = False
+        self.subscription.save()
+        self.assertEqual(subscription_index.material_ids(self.student.pk), set())
+        self.assertEqual(self.visible_test_ids(), [])
+
+    def test_index_follows_material_changes(self):
+        material = Material.objects.create(
+            title="New Material", description="New Description", course=self.course, owner=self.teacher
+        )
+        test2 = Test.objects.create(question="Test 2", material=material, owner=self.teacher)
+        self.assertEqual(self.visible_test_ids(), [self.test1.id, test2.id])
+
+        material.delete()
+        self.assertEqual(subscription_index.material_ids(self.student.pk), {self.material.id})
+
+    def test_scoping_does_not_query_subscriptions(self):
+        self.visible_test_ids()
+        with CaptureQueriesContext(connection) as queries:
+            self.visible_test_ids()
+        self.assertFalse(any("users_subscription" in query["sql"] for query in queries.captured_queries))
+
+
+class QueryPlanTests(APITestCase):
+    """Проверка планов запросов на горячих путях.
+
+    База заполняется данными, после чего для каждого запроса выполняется
+    EXPLAIN. Тест падает, если по одной из больших таблиц выполняется
+    последовательное чтение или в плане нет индекса, добавленного под этот
+    запрос: индексы по внешним ключам тоже исключают последовательное
+    чтение, но не покрывают фильтр и сортировку. В PostgreSQL
+    последовательное чтение отключается на время запроса
+    (enable_seqscan = off), поэтому оно остается в плане, только если
+    подходящего индекса нет.
+    """
+
+    large_tables = [
+        "learning_platform_material",
+        "learning_platform_test",
+        "learning_platform_answeroption",
+        "learning_platform_studentanswer",
+        "learning_platform_materialprogress",
+        "users_subscription",
+        "users_payment",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(email="teacher@example.com")
+        cls.students = User.objects.bulk_create(
+            User(email=f"student{i}@example.com") for i in range(20)
+        )
+        courses = Course.objects.bulk_create(
+            Course(title=f"Course {i}", description="Description", owner=cls.teacher, pay_amount_course=100)
+            for i in range(5)
+        )
+        materials = Material.objects.bulk_create(
+            Material(title=f"Material {i}", description="Description", course=courses[i % 5], owner=cls.teacher)
+            for i in range(25)
+        )
+        tests = Test.objects.bulk_create(
+            Test(question=f"Question {i}", material=materials[i % 25], owner=cls.teacher)
+            for i in range(100)
+        )
+        AnswerOption.objects.bulk_create(
+            AnswerOption(test=test, answer_text=text, is_correct=text == "Correct")
+            for test in tests
+            for text in ("Correct", "Incorrect")
+        )
+        StudentAnswer.objects.bulk_create(
+            StudentAnswer(student=student, test=test, selected_answer="Correct", is_correct=True)
+            for student in cls.students
+            for test in tests[:30]
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=student, course=course, is_subscribed=True)
+            for student in cls.students
+            for course in courses[:3]
+        )
+        Payment.objects.bulk_create(
+            Payment(user=student, pay_course=courses[0], pay_amount=100) for student in cls.students
+        )
+        MaterialProgress.objects.bulk_create(
+            MaterialProgress(student=student, material=material, course_id=material.course_id)
+            for student in cls.students
+            for material in materials
+        )
+        cls.course = courses[0]
+        cls.material = materials[0]
+        cls.test = tests[0]
+        cls.student = cls.students[0]
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                return queryset.explain()
+        return queryset.explain()
+
+    def assertNoSequentialScan(self, queryset):
+        plan = self.explain(queryset)
+        for table in self.large_tables:
+            if connection.vendor == "postgresql":
+                scanned = re.search(rf"Seq Scan on {table}\b", plan)
+            else:
+                scanned = re.search(rf"\bSCAN {table}\b(?! USING)", plan)
+            self.assertIsNone(scanned, f"Sequential scan on {table}:\n{plan}")
+        return plan
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = self.assertNoSequentialScan(queryset)
+        for index_name in index_names:
+            self.assertRegex(plan, rf"\b{index_name}\b", f"Index {index_name} not used:\n{plan}")
+
+    def test_subscriptions_by_user(self):
+        self.assertUsesIndex(
+            Subscription.objects.filter(user=self.student, is_subscribed=True).values_list("course_id"),
+            "subscription_user_active_idx",
+        )
+
+    def test_subscriptions_by_course(self):
+        self.assertUsesIndex(
+            Subscription.objects.filter(course=self.course, is_subscribed=True).values_list("user__email"),
+            "subscription_course_active_idx",
+        )
+
+    def test_student_answers_by_material(self):
+        test_ids = Test.objects.filter(material=self.material).values_list("id", flat=True)
+        self.assertUsesIndex(
+            StudentAnswer.objects.filter(test_id__in=test_ids), "test_material_id_idx", "studentanswer_latest_idx"
+        )
+        self.assertUsesIndex(
+            StudentAnswer.objects.filter(student=self.student, test_id__in=test_ids),
+            "test_material_id_idx",
+            "studentanswer_latest_idx",
+        )
+
+    def test_correct_answer_option(self):
+        self.assertUsesIndex(
+            AnswerOption.objects.filter(test=self.test, is_correct=True), "answeroption_test_correct_idx"
+        )
+
+    def test_payments_by_user(self):
+        self.assertUsesIndex(
+            Payment.objects.filter(user=self.student).order_by("pay_data"), "payment_user_pay_data_idx"
+        )
+
+    def test_material_list(self):
+        self.assertNoSequentialScan(
+            Material.objects.filter(Q(course_id__in=[self.course.id]) | Q(owner_id=self.student.pk))
+        )
+
+    def test_latest_attempts(self):
+        test_ids = Test.objects.filter(material=self.material).values_list("id", flat=True)
+        self.assertUsesIndex(
+            latest_attempts(StudentAnswer.objects.filter(test_id__in=test_ids)).order_by("id"),
+            "studentanswer_latest_idx",
+        )
+
+    def test_tests_page(self):
+        self.assertUsesIndex(
+            Test.objects.filter(material_id=self.material.id).order_by("material_id", "id")[:11],
+            "test_material_id_idx",
+        )
+
+    def test_material_progress(self):
+        self.assertUsesIndex(
+            MaterialProgress.objects.filter(student_id=self.student.pk, course_id=self.course.pk).order_by(
+                "material_id"
+            ),
+            "materialprogress_course_idx",
+        )
+
+
+class BulkAnswerSubmitTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.student = User.objects.create(email="student@example.com")
+        self.group_students = Group.objects.create(name="Студенты")
+        self.student.groups.add(self.group_students)
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        self.material = Material.objects.create(
+            title="Test Material",
+            description="Test Material description",
+            course=self.course,
+            owner=self.teacher,
+        )
+        self.tests = Test.objects.bulk_create(
+            Test(question=f"Question {i}", material=self.material, owner=self.teacher)
+            for i in range(50)
+        )
+        AnswerOption.objects.bulk_create(
+            AnswerOption(test=test, answer_text=text, is_correct=text == "Correct")
+            for test in self.tests
+            for text in ("Correct", "Incorrect")
+        )
+        self.url = reverse("learning_platform:student-answer-bulk")
+        self.client.force_authenticate(user=self.student)
+
+    def test_quiz_submitted_in_few_queries(self):
+        answers = [
+            {"test": test.id, "selected_answer": "Correct" if i % 2 else "Incorrect"}
+            for i, test in enumerate(self.tests)
+        ]
+        self.client.post(self.url, {"answers": answers[:1]}, format="json")  # роли в кэше
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {"answers": answers[:5]}, format="json")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {"answers": answers}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(queries.captured_queries), len(small.captured_queries))
+        self.assertLessEqual(len(queries.captured_queries), 10)
+        self.assertEqual([item["is_correct"] for item in response.data], [bool(i % 2) for i in range(50)])
+        self.assertEqual(StudentAnswer.objects.filter(student=self.student).count(), 56)
+
+    def test_answer_keys_cached_per_material(self):
+        with self.assertNumQueries(2):
+            answer_keys = get_answer_keys([self.tests[0].id])
+        self.assertEqual(answer_keys, {self.tests[0].id: {"Correct"}})
+        with self.assertNumQueries(0):
+            answer_keys = get_answer_keys([test.id for test in self.tests])
+        self.assertEqual(len(answer_keys), 50)
+
+    def test_answer_key_invalidated_on_option_change(self):
+        test = self.tests[0]
+        get_answer_keys([test.id])
+        AnswerOption.objects.filter(test=test, answer_text="Incorrect").first().delete()
+        option = AnswerOption.objects.get(test=test)
+        option.answer_text = "Renamed"
+        option.save()
+        self.assertEqual(get_answer_keys([test.id])[test.id], {"Renamed"})
+
+    def test_stale_answer_key_load_is_not_served(self):
+        test = self.tests[0]
+        set_many = cache.set_many
+        changed = []
+
+        def change_before_write(*args, **kwargs):
+            # Вариант ответа меняется между чтением БД загрузчиком и записью в кэш
+            if not changed:
+                changed.append(True)
+                AnswerOption.objects.filter(test=test, is_correct=True).update(answer_text="Changed")
+                forget_answer_keys(test.id)
+            return set_many(*args, **kwargs)
+
+        with patch.object(cache, "set_many", side_effect=change_before_write):
+            self.assertEqual(get_answer_keys([test.id])[test.id], {"Correct"})
+        self.assertEqual(get_answer_keys([test.id])[test.id], {"Changed"})
+
+    @override_settings(GRADING_ASYNC=True)
+    def test_async_grading(self):
+        answers = [
+            {"test": test.id, "selected_answer": "Correct" if i % 2 else "Incorrect"}
+            for i, test in enumerate(self.tests)
+        ]
+        response = self.client.post(self.url, {"answers": answers}, format="json")
+        self.assertEqual({item["grading_status"] for item in response.data}, {"pending"})
+
+        self.assertEqual(grade_pending_answers(batch_size=20), 50)
+        graded = StudentAnswer.objects.order_by("test_id")
+        self.assertEqual({answer.grading_status for answer in graded}, {"graded"})
+        self.assertEqual([answer.is_correct for answer in graded], [bool(i % 2) for i in range(50)])
+        self.assertEqual(grade_pending_answers(), 0)
+
+    def test_unknown_test_rejected(self):
+        response = self.client.post(
+            self.url, {"answers": [{"test": 0, "selected_answer": "Correct"}]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StudentAnswer.objects.exists())
+
+    def test_teacher_cannot_submit(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.post(
+            self.url, {"answers": [{"test": self.tests[0].id, "selected_answer": "Correct"}]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StudentProgressTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.student = User.objects.create(email="student@example.com")
+        self.group_students = Group.objects.create(name="Студенты")
+        self.student.groups.add(self.group_students)
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        self.materials = [
+            Material.objects.create(
+                title=f"Material {i}", description="Description", course=self.course, owner=self.teacher
+            )
+            for i in range(2)
+        ]
+        self.tests = [
+            Test.objects.create(question=f"Question {i}", material=self.materials[i % 2], owner=self.teacher)
+            for i in range(4)
+        ]
+        for test in self.tests:
+            AnswerOption.objects.create(answer_text="Correct", is_correct=True, test=test)
+            AnswerOption.objects.create(answer_text="Incorrect", test=test)
+        self.client.force_authenticate(user=self.student)
+
+    def submit(self, test, answer):
+        url = reverse("learning_platform:student-answer-list")
+        self.client.post(url, {"test": test.id, "selected_answer": answer}, format="json")
+
+    def get_progress(self):
+        url = reverse("learning_platform:student-progress", args=(self.course.pk,))
+        return self.client.get(url).data
+
+    def test_progress_updated_on_answer(self):
+        self.submit(self.tests[0], "Incorrect")
+        self.submit(self.tests[0], "Correct")
+        self.submit(self.tests[0], "Correct")
+        self.client.post(
+            reverse("learning_platform:student-answer-bulk"),
+            {"answers": [{"test": self.tests[1].id, "selected_answer": "Correct"}]},
+            format="json",
+        )
+        progress = self.get_progress()
+        self.assertEqual(
+            (progress["answers_count"], progress["correct_answers_count"]), (4, 3)
+        )
+        self.assertEqual((progress["attempted_tests"], progress["completed_tests"]), (2, 2))
+        self.assertEqual(
+            [(row["material"], row["answers_count"], row["completed_tests"]) for row in progress["materials"]],
+            [(self.materials[0].id, 3, 1), (self.materials[1].id, 1, 1)],
+        )
+
+    def test_progress_without_answers(self):
+        progress = self.get_progress()
+        self.assertEqual(progress["answers_count"], 0)
+        self.assertEqual(progress["materials"], [])
+
+    def test_rebuild_matches_incremental_progress(self):
+        for test, answer in [(self.tests[0], "Correct"), (self.tests[2], "Incorrect"), (self.tests[3], "Correct")]:
+            self.submit(test, answer)
+        expected = self.get_progress()
+        StudentProgress.objects.all().update(answers_count=0)
+        call_command("rebuild_progress", stdout=StringIO())
+        rebuilt = self.get_progress()
+        expected.pop("updated_at"), rebuilt.pop("updated_at")
+        self.assertEqual(rebuilt, expected)
+
+    def test_progress_row_locked_before_counting(self):
+        calls = []
+        lock = StudentProgress.objects.bulk_create
+        with (
+            patch.object(
+                StudentProgress.objects,
+                "bulk_create",
+                side_effect=lambda *args, **kwargs: calls.append(kwargs) or lock(*args, **kwargs),
+            ),
+            patch(
+                "learning_platform.progress.count_progress",
+                side_effect=lambda *args: calls.append("count") or count_progress(*args),
+            ),
+        ):
+            self.submit(self.tests[0], "Correct")
+        lock_call, count_call = calls
+        self.assertTrue(lock_call["update_conflicts"])
+        self.assertEqual(count_call, "count")
+        self.assertEqual(self.get_progress()["completed_tests"], 1)
+
+
+class GradebookExportTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.student = User.objects.create(email="student@example.com")
+        self.teacher.groups.add(Group.objects.create(name="Преподаватели"))
+        self.student.groups.add(Group.objects.create(name="Студенты"))
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        material = Material.objects.create(
+            title="Material", description="Description", course=self.course, owner=self.teacher
+        )
+        self.test = Test.objects.create(question="Question", material=material, owner=self.teacher)
+        StudentAnswer.objects.create(
+            student=self.student, test=self.test, selected_answer="Correct", is_correct=True
+        )
+        StudentAnswer.objects.create(
+            student=self.student, test=self.test, selected_answer="Incorrect", is_correct=False
+        )
+        self.url = reverse("learning_platform:course-export", args=(self.course.pk,))
+
+    def read(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("attachment", response["Content-Disposition"])
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], "student_id,student_email,test_id,question,selected_answer,is_correct,timestamp")
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith(f"{self.student.id},student@example.com,{self.test.id},Question,Correct,True,"))
+
+    def test_export_ndjson(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url, {"file_format": "ndjson"})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row["selected_answer"] for row in rows], ["Correct", "Incorrect"])
+        self.assertEqual(rows[0]["student_email"], "student@example.com")
+
+    def test_export_unknown_format(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url, {"file_format": "xlsx"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_forbidden_for_student(self):
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command("export_gradebook", self.course.pk, "--format", "ndjson", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_pending_answers_are_not_exported(self):
+        StudentAnswer.objects.create(
+            student=self.student,
+            test=self.test,
+            selected_answer="Correct",
+            grading_status=StudentAnswer.GradingStatus.PENDING,
+        )
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url, {"file_format": "ndjson"})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row["selected_answer"] for row in rows], ["Correct", "Incorrect"])
+
+
+class LeaderboardTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        leaderboard._store = LocalLeaderboardStore()
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        material = Material.objects.create(
+            title="Material", description="Description", course=self.course, owner=self.teacher
+        )
+        self.tests = [
+            Test.objects.create(question=f"Question {i}", material=material, owner=self.teacher)
+            for i in range(3)
+        ]
+        for test in self.tests:
+            AnswerOption.objects.create(answer_text="Correct", is_correct=True, test=test)
+        group_students = Group.objects.create(name="Студенты")
+        self.students = []
+        for i in range(3):
+            student = User.objects.create(email=f"student{i}@example.com")
+            student.groups.add(group_students)
+            Subscription.objects.create(user=student, course=self.course, is_subscribed=True)
+            self.students.append(student)
+        self.url = reverse("learning_platform:leaderboard", args=(self.course.pk,))
+
+    def tearDown(self):
+        leaderboard._store = None
+
+    def submit(self, student, answers):
+        self.client.force_authenticate(user=student)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("learning_platform:student-answer-bulk"),
+                {"answers": [{"test": test.id, "selected_answer": answer} for test, answer in answers]},
+                format="json",
+            )
+
+    def submit_all(self):
+        # 2 правильных ответа, оба с первой попытки
+        self.submit(self.students[0], [(self.tests[0], "Correct"), (self.tests[1], "Correct")])
+        # 2 правильных ответа, один с первой попытки
+        self.submit(
+            self.students[1],
+            [(self.tests[0], "Wrong"), (self.tests[0], "Correct"), (self.tests[1], "Correct")],
+        )
+        # 1 правильный ответ
+        self.submit(self.students[2], [(self.tests[2], "Correct")])
+
+    def test_ranking_by_correct_answers_and_first_attempts(self):
+        self.submit_all()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(entry["rank"], entry["student"], entry["score"]) for entry in response.data["top"]],
+            [
+                (1, self.students[0].pk, 2.5),
+                (2, self.students[1].pk, 2.25),
+                (3, self.students[2].pk, 1.5),
+            ],
+        )
+        self.assertNotIn("email", response.data["top"][0])
+        self.assertEqual(response.data["me"]["rank"], 3)
+
+    def test_equal_scores_share_rank(self):
+        self.submit(self.students[0], [(self.tests[0], "Correct")])
+        self.submit(self.students[1], [(self.tests[1], "Correct")])
+        self.assertEqual([entry["rank"] for entry in leaderboard.top(self.course.pk)], [1, 1])
+        self.assertEqual(leaderboard.position(self.course.pk, self.students[1].pk)["rank"], 1)
+
+    def test_resubmitting_correct_answer_does_not_change_rank(self):
+        self.submit_all()
+        expected = leaderboard.top(self.course.pk)
+        self.submit(self.students[2], [(self.tests[2], "Correct")] * 3)
+        self.assertEqual(leaderboard.top(self.course.pk), expected)
+        leaderboard._store = LocalLeaderboardStore()
+        rebuild_leaderboards()
+        self.assertEqual(leaderboard.top(self.course.pk), expected)
+
+    def test_unsubscribed_student_removed(self):
+        self.submit_all()
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.filter(user=self.students[0]).update(is_subscribed=False)
+            Subscription.objects.get(user=self.students[0]).save()
+        self.client.force_authenticate(user=self.students[1])
+        response = self.client.get(self.url, {"limit": 1})
+        self.assertEqual([entry["student"] for entry in response.data["top"]], [self.students[1].pk])
+        self.assertIsNone(leaderboard.position(self.course.pk, self.students[0].pk))
+
+    def test_leaderboard_limited_to_subscribers_and_teachers(self):
+        self.submit_all()
+        outsider = User.objects.create(email="outsider@example.com")
+        self.client.force_authenticate(user=outsider)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["me"])
+
+    def test_rebuild_matches_incremental_ranking(self):
+        self.submit_all()
+        expected = leaderboard.top(self.course.pk)
+        leaderboard._store = LocalLeaderboardStore()
+        self.assertEqual(rebuild_leaderboards(), 3)
+        self.assertEqual(leaderboard.top(self.course.pk), expected)
+
+    def test_local_store_ranks(self):
+        store = LocalLeaderboardStore()
+        store.add(1, {10: 1.0, 11: 3.0, 12: 2.0})
+        store.add(1, {10: 4.0})
+        store.remove(1, 12)
+        self.assertEqual(store.top(1, 5), [(10, 4.0), (11, 3.0)])
+        self.assertEqual(store.rank(1, 11), (2, 3.0))
+        self.assertIsNone(store.rank(1, 12))
+
+
+class AnswerActivityRollupTests(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.teacher.groups.add(Group.objects.create(name="Преподаватели"))
+        self.students = [User.objects.create(email=f"student{i}@example.com") for i in range(2)]
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        self.materials = [
+            Material.objects.create(
+                title=f"Material {i}", description="Description", course=self.course, owner=self.teacher
+            )
+            for i in range(2)
+        ]
+        self.tests = [
+            Test.objects.create(question=f"Question {i}", material=material, owner=self.teacher)
+            for i, material in enumerate(self.materials)
+        ]
+        self.day = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+    def answer(self, student, test, hour, is_correct=True, **kwargs):
+        answer = StudentAnswer.objects.create(
+            student=student, test=test, selected_answer="Answer", is_correct=is_correct, **kwargs
+        )
+        StudentAnswer.objects.filter(pk=answer.pk).update(timestamp=self.day + timedelta(hours=hour, minutes=10))
+        return answer
+
+    def rollup(self, period, material=None, hour=0):
+        return AnswerActivityRollup.objects.get(
+            period=period,
+            course=self.course,
+            material=material,
+            bucket_start=self.day + timedelta(hours=hour),
+        )
+
+    def test_rollup_counts_by_hour_and_day(self):
+        self.answer(self.students[0], self.tests[0], 1)
+        self.answer(self.students[0], self.tests[1], 1, is_correct=False)
+        self.answer(self.students[1], self.tests[0], 2)
+        rollup_answer_activity()
+
+        hour = self.rollup("hour", hour=1)
+        self.assertEqual((hour.answers_count, hour.correct_answers_count, hour.active_students), (2, 1, 1))
+        day = self.rollup("day")
+        self.assertEqual((day.answers_count, day.correct_answers_count, day.active_students), (3, 2, 2))
+        material_day = self.rollup("day", material=self.materials[0])
+        self.assertEqual((material_day.answers_count, material_day.active_students), (2, 2))
+
+    def test_only_new_answers_after_checkpoint(self):
+        self.answer(self.students[0], self.tests[0], 1)
+        rollup_answer_activity()
+        checkpoint = RollupCheckpoint.objects.get().high_water_mark
+
+        self.assertEqual(rollup_answer_activity(), 0)
+        answer = self.answer(self.students[1], self.tests[0], 1)
+        StudentAnswer.objects.filter(pk=answer.pk).update(timestamp=checkpoint + timedelta(seconds=1))
+        rollup_answer_activity(now=checkpoint + timedelta(minutes=5))
+        hour = AnswerActivityRollup.objects.get(
+            period="hour", material=None, bucket_start=bucket_start("hour", checkpoint)
+        )
+        self.assertEqual((hour.answers_count, hour.active_students), (1, 1))
+        self.assertEqual(self.rollup("hour", hour=1).answers_count, 1)
+
+    def test_checkpoint_stops_at_pending_answer(self):
+        self.answer(self.students[0], self.tests[0], 1)
+        self.answer(self.students[0], self.tests[0], 3, grading_status=StudentAnswer.GradingStatus.PENDING)
+        self.answer(self.students[1], self.tests[0], 5)
+        rollup_answer_activity()
+        self.assertEqual(RollupCheckpoint.objects.get().high_water_mark, self.day + timedelta(hours=3, minutes=10))
+        self.assertFalse(AnswerActivityRollup.objects.filter(period="hour", bucket_start=self.day + timedelta(hours=5)).exists())
+
+    def test_activity_endpoint(self):
+        self.answer(self.students[0], self.tests[0], 1)
+        rollup_answer_activity()
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse("learning_platform:answer-activity", args=(self.course.pk,))
+        response = self.client.get(url, {"period": "day"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["answers_count"] for row in response.data], [1])
+        response = self.client.get(url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ItemAnalysisTests(APITestCase):
+
+    def setUp(self):
+        teacher = User.objects.create(email="teacher@example.com")
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=teacher,
+            pay_amount_course=200,
+        )
+        material = Material.objects.create(
+            title="Material", description="Description", course=self.course, owner=teacher
+        )
+        self.tests = [
+            Test.objects.create(question=f"Question {i}", material=material, owner=teacher) for i in range(2)
+        ]
+        self.options = {}
+        for test in self.tests:
+            for text in ("A", "B", "C"):
+                self.options[(test.id, text)] = AnswerOption.objects.create(
+                    answer_text=text, is_correct=text == "A", test=test
+                )
+        # Ответы студентов (первая попытка; у student0 есть повторная попытка по тесту 0)
+        answers = {
+            0: [("A", "B"), ("A",)],
+            1: [("A",), ("A",)],
+            2: [("B",), ("C",)],
+            3: [("X",), ("B",)],
+        }
+        for i, tests_answers in answers.items():
+            student = User.objects.create(email=f"student{i}@example.com")
+            for test, attempts in zip(self.tests, tests_answers):
+                for text in attempts:
+                    StudentAnswer.objects.create(
+                        student=student, test=test, selected_answer=text, is_correct=text == "A"
+                    )
+
+    def test_statistics_use_first_attempts(self):
+        self.assertEqual(analyze_items([self.course.pk]), 2)
+        stats = TestItemStatistics.objects.get(test=self.tests[0])
+        self.assertEqual(stats.students_count, 4)
+        self.assertEqual(stats.difficulty, 0.5)
+        # Верхняя группа (1 студент) ответила верно, нижняя - нет
+        self.assertEqual(stats.discrimination, 1.0)
+        options = {key: self.options[(self.tests[0].id, text)].id for key, text in (("a", "A"), ("b", "B"), ("c", "C"))}
+        self.assertEqual(
+            stats.option_shares,
+            {str(options["a"]): 0.5, str(options["b"]): 0.25, str(options["c"]): 0.0, "other": 0.25},
+        )
+
+    def test_rows_outside_axes_are_skipped(self):
+        # Тест 0 появился после чтения оси тестов: его ответы не должны попасть в столбец теста 1
+        test = self.tests[1]
+        test_ids = np.array([test.id], dtype=np.int64)
+        option_ids = np.array(
+            sorted(option.id for (test_id, _), option in self.options.items() if test_id == test.id), dtype=np.int64
+        )
+        correct, answered, option_counts, other_counts = load_response_matrix(self.course.pk, test_ids, option_ids)
+        self.assertEqual(correct[:, 0].tolist(), [1, 1, 0, 0])
+        self.assertTrue(answered.all())
+        self.assertEqual(option_counts.tolist(), [2, 1, 1])
+        self.assertEqual(other_counts.tolist(), [0])
+
+    def test_vectorized_statistics_match_direct_calculation(self):
+        rng = np.random.default_rng(0)
+        answered = rng.random((200, 5)) < 0.9
+        correct = ((rng.random((200, 5)) < 0.6) & answered).astype(np.int8)
+        stats = item_statistics(correct, answered)
+        totals = correct.sum(axis=1)
+        for test in range(5):
+            mask = answered[:, test]
+            item = correct[mask, test]
+            self.assertAlmostEqual(stats["difficulty"][test], item.mean())
+            self.assertAlmostEqual(
+                stats["point_biserial"][test], np.corrcoef(item, totals[mask] - item)[0, 1]
+            )
+
+    def test_command_updates_existing_statistics(self):
+        call_command("analyze_test_items", stdout=StringIO())
+        StudentAnswer.objects.filter(test=self.tests[1]).update(is_correct=True)
+        call_command("analyze_test_items", self.course.pk, stdout=StringIO())
+        self.assertEqual(TestItemStatistics.objects.count(), 2)
+        self.assertEqual(TestItemStatistics.objects.get(test=self.tests[1]).difficulty, 1.0)
+
+
+class AnswerArchiveTests(APITestCase):
+
+    def setUp(self):
+        self.archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_dir.cleanup)
+        settings_override = override_settings(ANSWER_ARCHIVE_DIR=self.archive_dir.name, ANSWER_ARCHIVE_AFTER_DAYS=30)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.teacher.groups.add(Group.objects.create(name="Преподаватели"))
+        group_students = Group.objects.create(name="Студенты")
+        self.students = [User.objects.create(email=f"student{i}@example.com") for i in range(2)]
+        for student in self.students:
+            student.groups.add(group_students)
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+            finished_at=timezone.now() - timedelta(days=40),
+        )
+        material = Material.objects.create(
+            title="Material", description="Description", course=self.course, owner=self.teacher
+        )
+        self.test = Test.objects.create(question="Question", material=material, owner=self.teacher)
+        old = timezone.now() - timedelta(days=60)
+        for i in range(5):
+            answer = StudentAnswer.objects.create(
+                student=self.students[i % 2], test=self.test, selected_answer=f"Answer {i}", is_correct=i == 0
+            )
+            StudentAnswer.objects.filter(pk=answer.pk).update(timestamp=old)
+        self.recent = StudentAnswer.objects.create(student=self.students[0], test=self.test, selected_answer="Recent")
+
+    def test_old_answers_moved_to_segments(self):
+        self.assertEqual(archive_answers(segment_size=2), 3)
+        # Первые попытки студентов (Answer 0 и Answer 1) остаются в БД
+        self.assertEqual(
+            sorted(StudentAnswer.objects.values_list("selected_answer", flat=True)),
+            ["Answer 0", "Answer 1", "Recent"],
+        )
+        segments = AnswerArchiveSegment.objects.order_by("first_answer_id")
+        self.assertEqual([segment.answers_count for segment in segments], [2, 1])
+        with gzip.open(f"{self.archive_dir.name}/{segments[0].path}", "rt") as lines:
+            row = json.loads(lines.readline())
+        self.assertEqual(row["selected_answer"], "Answer 2")
+        self.assertFalse(row["is_correct"])
+
+    def test_first_correct_answer_kept(self):
+        StudentAnswer.objects.filter(selected_answer="Answer 0").update(is_correct=False)
+        StudentAnswer.objects.filter(selected_answer="Answer 4").update(is_correct=True)
+        archive_answers()
+        self.assertEqual(
+            sorted(StudentAnswer.objects.values_list("selected_answer", flat=True)),
+            ["Answer 0", "Answer 1", "Answer 4", "Recent"],
+        )
+
+    def test_progress_after_archival_keeps_first_attempt(self):
+        call_command("rebuild_progress", stdout=StringIO())
+        archive_answers()
+        # Повторные ответы после архивации: тест уже начат, а студентом 0 и пройден
+        answers = [
+            StudentAnswer.objects.create(student=student, test=self.test, selected_answer="Again", is_correct=True)
+            for student in self.students
+        ]
+        record_graded_answers(answers)
+        progress = {
+            row["student_id"]: row
+            for row in StudentProgress.objects.values(
+                "student_id", "answers_count", "attempted_tests", "completed_tests", "first_attempt_correct_tests"
+            )
+        }
+        first, second = (progress[student.pk] for student in self.students)
+        self.assertEqual(
+            (first["answers_count"], first["attempted_tests"], first["completed_tests"]), (5, 1, 1)
+        )
+        self.assertEqual(
+            (second["answers_count"], second["attempted_tests"], second["completed_tests"]), (3, 1, 1)
+        )
+        self.assertEqual((first["first_attempt_correct_tests"], second["first_attempt_correct_tests"]), (1, 0))
+
+    def test_answers_graded_during_segment_write_are_not_lost(self):
+        pending = StudentAnswer.objects.filter(selected_answer="Answer 2")
+        pending.update(grading_status=StudentAnswer.GradingStatus.PENDING)
+        write = archive_module.write_segment
+
+        def grade_while_writing(path, rows):
+            # Ответ из диапазона id пачки проверен после ее чтения
+            pending.update(grading_status=StudentAnswer.GradingStatus.GRADED)
+            write(path, rows)
+
+        with patch("learning_platform.archive.write_segment", side_effect=grade_while_writing):
+            self.assertEqual(archive_answers(), 3)
+        archived = [
+            json.loads(line)["selected_answer"]
+            for line in iter_archived_answers(self.course.pk)
+        ]
+        self.assertEqual(sorted(archived), ["Answer 2", "Answer 3", "Answer 4"])
+
+    def test_unfinished_course_not_archived(self):
+        Course.objects.filter(pk=self.course.pk).update(finished_at=None)
+        call_command("archive_answers", stdout=StringIO())
+        self.assertEqual(StudentAnswer.objects.count(), 6)
+        self.assertFalse(AnswerArchiveSegment.objects.exists())
+
+    def test_archived_answers_endpoint(self):
+        archive_answers()
+        url = reverse("learning_platform:archived-answers", args=(self.course.pk,))
+
+        self.client.force_authenticate(user=self.students[1])
+        response = self.client.get(url)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["selected_answer"] for row in rows], ["Answer 3"])
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(url)
+        self.assertEqual(len(b"".join(response.streaming_content).decode().splitlines()), 3)
+
+    def test_rebuild_progress_keeps_archived_courses(self):
+        StudentProgress.objects.create(student=self.students[0], course=self.course, answers_count=4)
+        archive_answers()
+        call_command("rebuild_progress", stdout=StringIO())
+        self.assertEqual(StudentProgress.objects.get().answers_count, 4)
+
+
+class CourseBundleTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.student = User.objects.create(email="student@example.com")
+        self.student.groups.add(Group.objects.create(name="Студенты"))
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Course description",
+            owner=self.teacher,
+            pay_amount_course=200,
+        )
+        Subscription.objects.create(user=self.student, course=self.course, is_subscribed=True)
+        self.material = Material.objects.create(
+            title="Material", description="Description", course=self.course, owner=self.teacher
+        )
+        self.test = Test.objects.create(question="Question", material=self.material, owner=self.teacher)
+        AnswerOption.objects.create(answer_text="Correct", is_correct=True, test=self.test)
+        AnswerOption.objects.create(answer_text="Incorrect", test=self.test)
+        self.url = reverse("learning_platform:course-bundle", args=(self.course.pk,))
+        self.client.force_authenticate(user=self.student)
+
+    def test_bundle_is_gzipped_without_correct_flags(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        data = json.loads(gzip.decompress(response.content))
+        test = data["materials"][0]["tests"][0]
+        self.assertEqual(test["question"], "Question")
+        self.assertEqual([option["answer_text"] for option in test["answer_options"]], ["Correct", "Incorrect"])
+        self.assertNotIn("is_correct", test["answer_options"][0])
+
+    def test_etag_and_cache_headers(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertEqual(json.loads(response.content)["title"], "Test Course")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.url, {"v": etag.strip('"')})
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_content_change_rebuilds_bundle(self):
+        etag = self.client.get(self.url)["ETag"]
+        OutboxMessage.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            Test.objects.create(question="New question", material=self.material, owner=self.teacher)
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list("task", "args")),
+            [("learning_platform.tascs.rebuild_course_bundle", [self.course.pk])],
+        )
+        response = self.client.get(self.url)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(json.loads(response.content)["materials"][0]["tests"]), 2)
+
+    def test_bundle_requires_subscription(self):
+        Subscription.objects.filter(user=self.student).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AnonymousResponseCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.create_course("Course 1")
+        self.url = reverse("learning_platform:course-list")
+
+    def create_course(self, title):
+        return Course.objects.create(title=title, description="Description", owner=self.teacher, pay_amount_course=100)
+
+    def titles(self, response):
+        return [course["title"] for course in response.json()["results"]]
+
+    def test_repeated_anonymous_request_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(self.titles(response), ["Course 1"])
+
+    def test_query_order_does_not_change_key(self):
+        self.client.get(self.url, {"page_size": 5, "a": 1})
+        response = self.client.get(f"{self.url}?a=1&page_size=5")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer token")
+        self.assertNotIn("X-Cache", response)
+
+    def test_course_change_invalidates_entries(self):
+        self.client.get(self.url)
+        self.create_course("Course 2")
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(self.titles(response), ["Course 1", "Course 2"])
+
+    def test_stale_entry_served_while_another_worker_rebuilds(self):
+        self.client.get(self.url)
+        self.create_course("Course 2")
+        cache.add(f"{response_cache_key(self.client.get(self.url).wsgi_request)}:lock", 1)
+        self.create_course("Course 3")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "STALE")
+        self.assertEqual(self.titles(response), ["Course 1", "Course 2"])
+
+    def test_cached_etag_answers_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+
+class SubscriberNotificationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.teacher.groups.add(Group.objects.create(name="Преподаватели"))
+        self.course = Course.objects.create(
+            title="Test Course", description="Description", owner=self.teacher, pay_amount_course=100
+        )
+        self.material = Material.objects.create(
+            title="Material", description="Description", course=self.course, owner=self.teacher
+        )
+        for i in range(5):
+            student = User.objects.create(email=f"student{i}@example.com")
+            Subscription.objects.create(user=student, course=self.course, is_subscribed=i != 4)
+
+    def update_material(self, material, title):
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse("learning_platform:materials-update", args=(material.pk,))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, {"title": title}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_updates_are_coalesced_into_one_digest(self):
+        other = Material.objects.create(
+            title="Other", description="Description", course=self.course, owner=self.teacher
+        )
+        self.update_material(self.material, "First")
+        self.update_material(self.material, "Second")
+        self.update_material(other, "Third")
+        self.assertEqual(PendingCourseUpdate.objects.count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Материалы меняются недавно: письмо ждет окончания тишины
+        self.assertEqual(flush_course_updates(), 0)
+        later = timezone.now() + settings.NOTIFICATION_QUIET_PERIOD + timedelta(seconds=1)
+        self.assertEqual(flush_course_updates(now=later), 4)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertIn("- Second\n- Third", mail.outbox[0].body)
+        self.assertFalse(PendingCourseUpdate.objects.exists())
+        self.assertEqual(flush_course_updates(now=later), 0)
+
+    def test_digest_is_sent_after_max_delay_despite_changes(self):
+        self.update_material(self.material, "First")
+        PendingCourseUpdate.objects.update(
+            first_changed_at=timezone.now() - settings.NOTIFICATION_MAX_DELAY
+        )
+        self.update_material(self.material, "Second")
+        self.assertEqual(flush_course_updates(), 4)
+        self.assertIn("- Second", mail.outbox[0].body)
+
+    def test_changes_made_during_sending_wait_for_quiet_period(self):
+        self.update_material(self.material, "First")
+        PendingCourseUpdate.objects.update(
+            first_changed_at=timezone.now() - settings.NOTIFICATION_MAX_DELAY + timedelta(minutes=1)
+        )
+        later = timezone.now() + settings.NOTIFICATION_QUIET_PERIOD + timedelta(seconds=1)
+
+        def send(course_id, material_titles):
+            PendingCourseUpdate.objects.update(changed_at=later)
+            return 0
+
+        with patch("learning_platform.notifications.send_course_notification", send):
+            flush_course_updates(now=later)
+        self.assertTrue(PendingCourseUpdate.objects.exists())
+        # Отсчет максимальной задержки для неразосланных изменений начат заново
+        self.assertEqual(flush_course_updates(now=later + timedelta(minutes=1)), 0)
+        self.assertEqual(flush_course_updates(now=later + settings.NOTIFICATION_QUIET_PERIOD), 4)
+
+    def test_overlapping_flushes_send_digest_once(self):
+        self.update_material(self.material, "First")
+        later = timezone.now() + settings.NOTIFICATION_QUIET_PERIOD + timedelta(seconds=1)
+        send = notifications_module.send_course_notification
+        overlapping = []
+
+        def send_with_overlapping_flush(course_id, material_titles):
+            # Следующий запуск задачи начинается, пока идет рассылка
+            overlapping.append(flush_course_updates(now=later))
+            return send(course_id, material_titles)
+
+        with patch(
+            "learning_platform.notifications.send_course_notification",
+            side_effect=send_with_overlapping_flush,
+        ):
+            self.assertEqual(flush_course_updates(now=later), 4)
+        self.assertEqual(overlapping, [0])
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertFalse(PendingCourseUpdate.objects.exists())
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_fan_out_sends_batches_over_one_connection(self):
+        with patch("django.core.mail.backends.locmem.EmailBackend.open") as open_connection:
+            self.assertEqual(send_course_notification(self.course.pk), 4)
+        open_connection.assert_called_once()
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f"student{i}@example.com" for i in range(4)])
+        self.assertEqual(mail.outbox[0].subject, "Обновление курса: Test Course")
+
+
+class OutboxTests(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email="teacher@example.com")
+        self.teacher.groups.add(Group.objects.create(name="Преподаватели"))
+        self.course = Course.objects.create(
+            title="Test Course", description="Description", owner=self.teacher, pay_amount_course=100
+        )
+        self.material = Material.objects.create(
+            title="Material", description="Description", course=self.course, owner=self.teacher
+        )
+        OutboxMessage.objects.all().delete()
+
+    def test_request_writes_outbox_without_broker(self):
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse("learning_platform:course-detail", args=(self.course.pk,))
+        with patch("learning_platform.outbox.current_app") as app:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(url, {"title": "New title"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        app.send_task.assert_not_called()
+        self.assertTrue(OutboxMessage.objects.filter(args=[self.course.pk]).exists())
+
+    def test_rolled_back_transaction_leaves_no_message(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            enqueue(rebuild_course_bundle, self.course.pk)
+            raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(OUTBOX_BATCH_SIZE=2)
+    def test_dispatch_publishes_batches(self):
+        for _ in range(5):
+            enqueue(rebuild_course_bundle, self.course.pk)
+        with patch("learning_platform.outbox.current_app") as app:
+            self.assertEqual(dispatch_outbox(), 5)
+        self.assertEqual(app.producer_or_acquire.call_count, 3)
+        self.assertEqual(app.send_task.call_count, 5)
+        self.assertEqual(
+            app.send_task.call_args.args, ("learning_platform.tascs.rebuild_course_bundle",)
+        )
+        self.assertEqual(app.send_task.call_args.kwargs["args"], [self.course.pk])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_failed_publish_keeps_messages(self):
+        enqueue(rebuild_course_bundle, self.course.pk)
+        with patch("learning_platform.outbox.current_app") as app:
+            app.send_task.side_effect = ConnectionError
+            with self.assertRaises(ConnectionError):
+                dispatch_outbox()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_command_dispatches_once(self):
+        enqueue(rebuild_course_bundle, self.course.pk)
+        out = StringIO()
+        with patch("learning_platform.outbox.current_app"):
+            call_command("dispatch_outbox", "--once", stdout=out)
+        self.assertIn("Отправлено задач: 1", out.getvalue())
+
+
+class PooledEmailBackendTests(APITestCase):
+
+    def setUp(self):
+        self.server = LocalSMTPServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.addCleanup(pool.close_all)
+
+    def send(self, count):
+        host, port = self.server.server_address
+        for index in range(count):
+            connection = get_connection(
+                "learning_platform.mail.PooledEmailBackend", host=host, port=port,
+                username="", password="", use_ssl=False, use_tls=False,
+            )
+            send_mail("Subject", "Body", "noreply@example.com", [f"s{index}@example.com"], connection=connection)
+
+    def test_connection_is_reused_between_sends(self):
+        self.send(5)
+        self.assertEqual(self.server.messages, 5)
+        self.assertEqual(self.server.connections, 1)
+
+    @override_settings(EMAIL_POOL_MAX_MESSAGES=2)
+    def test_connection_is_replaced_after_max_messages(self):
+        self.send(5)
+        self.assertEqual(self.server.messages, 5)
+        self.assertEqual(self.server.connections, 3)
+
+    @override_settings(EMAIL_POOL_CHECK_AFTER=0)
+    def test_dead_idle_connection_is_replaced(self):
+        self.send(1)
+        for smtp_connection, _, _ in next(iter(pool.idle.values())):
+            smtp_connection.close()
+        self.send(1)
+        self.assertEqual(self.server.messages, 2)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_message_is_resent_after_disconnect(self):
+        self.send(1)
+        # Без проверки NOOP разрыв обнаруживается только при отправке
+        for smtp_connection, _, _ in next(iter(pool.idle.values())):
+            smtp_connection.close()
+        self.send(1)
+        self.assertEqual(self.server.messages, 2)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_message_is_resent_after_socket_reset(self):
+        self.send(1)
+        for smtp_connection, _, _ in next(iter(pool.idle.values())):
+            smtp_connection.sendmail = Mock(side_effect=ConnectionResetError)
+        self.send(1)
+        self.assertEqual(self.server.messages, 2)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_smtp_error_is_not_retried(self):
+        self.send(1)
+        for smtp_connection, _, _ in next(iter(pool.idle.values())):
+            smtp_connection.sendmail = Mock(side_effect=smtplib.SMTPRecipientsRefused({}))
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.send(1)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_email", "--messages", "3", "--connect-delay", "0", stdout=out)
+        self.assertIn("pooled:", out.getvalue())
+        self.assertIn("соединений: 1, писем принято: 3", out.getvalue())
+
+
+class CeleryTopologyTests(APITestCase):
+
+    def test_tasks_are_routed_to_queues_with_their_limits(self):
+        self.assertEqual(task_queue(flush_course_updates_task.name), "email")
+        self.assertEqual(task_queue(grade_pending_answers.name), "grading")
+        self.assertEqual(task_queue(rebuild_course_bundle.name), "default")
+        # Сводки раз в 5 минут не ждут часовых задач очереди analytics
+        self.assertEqual(task_queue(rebuild_leaderboards.name), "analytics")
+        self.assertEqual(task_queue(rollup_activity.name), "rollups")
+        self.assertEqual(
+            flush_course_updates_task.time_limit,
+            settings.CELERY_WORKER_QUEUES["email"]["time_limit"],
+        )
+        self.assertEqual(
+            rebuild_leaderboards.soft_time_limit,
+            settings.CELERY_WORKER_QUEUES["analytics"]["soft_time_limit"],
+        )
+
+    def test_command_prints_worker_per_queue(self):
+        out = StringIO()
+        call_command("celery_topology", stdout=out)
+        output = out.getvalue()
+        for queue in settings.CELERY_WORKER_QUEUES:
+            self.assertIn(f"-Q {queue} ", output)
+        self.assertIn("-Q email -n email@%h -c 8 --prefetch-multiplier 1", output)
+        self.assertNotIn("не обслуживается", output)
+
+
+class CacheSettingsTests(APITestCase):
+
+    def load_settings(self, **environ):
+        # Пустой CACHE_LOCATION - как незаданный
+        environ.setdefault("CACHE_LOCATION", "")
+        with (
+            patch.dict(os.environ, environ),
+            patch.object(sys, "argv", ["manage.py", "runserver"]),
+        ):
+            return runpy.run_module("config.settings")
+
+    def test_cache_location_required_without_debug(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(DEBUG="False")
+
+    def test_local_cache_allowed_in_debug(self):
+        loaded = self.load_settings(DEBUG="True")
+        self.assertEqual(
+            loaded["CACHES"]["default"]["BACKEND"], "django.core.cache.backends.locmem.LocMemCache"
+        )
+
+    def test_redis_cache_without_debug(self):
+        loaded = self.load_settings(DEBUG="False", CACHE_LOCATION="redis://localhost:6379/1")
+        self.assertEqual(loaded["CACHES"]["default"]["LOCATION"], "redis://localhost:6379/1")
@@ -11,6 +11,10 @@ from learning_platform.views import (
     MaterialUpdateAPIView,
     TestViewSet,
     StudentAnswerViewSet, CheckAnswersView,
+    StudentProgressAPIView,
+    LeaderboardAPIView,
+    AnswerActivityAPIView,
+    ArchivedAnswersAPIView,
 )
 
 app_name = LearningPlatformConfig.name
@@ -37,6 +41,10 @@ urlpatterns = [
         name="materials-delete",
     ),
     path('check-answers/', CheckAnswersView.as_view(), name='check-answers'),
+    path('progress/<int:course_id>/', StudentProgressAPIView.as_view(), name='student-progress'),
+    path('leaderboard/<int:course_id>/', LeaderboardAPIView.as_view(), name='leaderboard'),
+    path('activity/<int:course_id>/', AnswerActivityAPIView.as_view(), name='answer-activity'),
+    path('archive/<int:course_id>/', ArchivedAnswersAPIView.as_view(), name='archived-answers'),
 
 ]
 
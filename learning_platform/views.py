@@ -1,6 +1,16 @@
+import gzip
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.generics import (
     CreateAPIView,
     DestroyAPIView,
@@ -13,19 +23,56 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from learning_platform.models import AnswerOption, Course, Material, StudentAnswer, Test
-from learning_platform.paginators import CustomOffsetPagination, StudentAnswerPagination
+from learning_platform.archive import iter_archived_answers
+from learning_platform.bundles import get_course_bundle
+from learning_platform.catalog import (
+    catalog_etag,
+    catalog_page_digest,
+    get_catalog_page,
+    get_catalog_version,
+    set_catalog_page,
+)
+from learning_platform.grading import get_answer_keys, is_correct_answer, submit_answers
+from learning_platform.leaderboard import LEADERBOARD_MAX_SIZE, LEADERBOARD_SIZE, leaderboard
+from learning_platform.models import (
+    AnswerActivityRollup,
+    Course,
+    Material,
+    MaterialProgress,
+    StudentAnswer,
+    StudentProgress,
+    Test,
+)
+from learning_platform.notifications import record_course_update
+from learning_platform.paginators import (
+    CourseKeysetPagination,
+    StudentAnswerPagination,
+    TestKeysetPagination,
+)
 from learning_platform.permissions import IsTeacher, IsStudent
+from learning_platform.progress import record_graded_answers
+from learning_platform.reports import (
+    GRADEBOOK_FORMATS,
+    answer_summary,
+    iter_gradebook,
+    latest_attempts,
+)
+from learning_platform.streaming import StreamingJSONResponse, buffered
+from learning_platform.subscriptions import subscription_index
 from learning_platform.serializers import (
+    AnswerActivityRollupSerializer,
     CourseSerializer,
     MaterialSerializer,
     StudentAnswerSerializer,
     TestSerializer,
     StudentAnswerListSerializer,
+    StudentAnswerBulkSerializer,
+    MaterialProgressSerializer,
+    StudentProgressSerializer,
 )
 from rest_framework import serializers
-from users.models import Subscription
-from learning_platform.tascs import send_update_notification
+from users.models import User
+from users.roles import is_student, is_teacher
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,13 +81,14 @@ logger = logging.getLogger(__name__)
 class CourseViewSet(ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    pagination_class = CourseKeysetPagination
 
     def get_permissions(self):
         if self.action == "list":
             permission_classes = [AllowAny]
         elif self.action == "create":
             permission_classes = [IsAuthenticated, IsTeacher]
-        elif self.action in ["update", "retrieve", "destroy"]:
+        elif self.action in ["update", "retrieve", "destroy", "export"]:
             permission_classes = [IsAuthenticated, IsTeacher]
         else:
             permission_classes = [IsAuthenticated]
@@ -50,9 +98,80 @@ class CourseViewSet(ModelViewSet):
         return serializer.save(owner=self.request.user)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """Публичный каталог курсов.
+
+        Страницы кэшируются по версии каталога, которая меняется при
+        сохранении или удалении курса; неизменившаяся страница отдается
+        без обращения к БД, а при совпадении ETag - ответом 304.
+        """
+        digest = catalog_page_digest(get_catalog_version(), request)
+        etag = catalog_etag(digest)
+        headers = {"ETag": etag}
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = get_catalog_page(digest)
+        if data is None:
+            page = self.paginate_queryset(self.get_queryset())
+            serializer = self.get_serializer(page, many=True)
+            data = self.get_paginated_response(serializer.data).data
+            set_catalog_page(digest, data)
+        return Response(data, headers=headers)
+
+    @action(detail=True, methods=["get"])
+    def export(self, request, *args, **kwargs):
+        """Потоковая выгрузка всех ответов студентов по курсу (csv или ndjson)"""
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in GRADEBOOK_FORMATS:
+            return Response(
+                {"detail": f"file_format must be one of: {', '.join(GRADEBOOK_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        course = self.get_object()
+        content_type, extension = GRADEBOOK_FORMATS[file_format][1:]
+        response = StreamingHttpResponse(
+            iter_gradebook(course.pk, file_format), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="gradebook_course_{course.pk}.{extension}"'
+        )
+        return response
+
+    @action(detail=True, methods=["get"])
+    def bundle(self, request, pk=None):
+        """Материалы, тесты и варианты ответов курса одним сжатым ответом.
+
+        Пакет собирается заранее задачей rebuild_course_bundle. При совпадении
+        If-None-Match возвращается 304, а адрес с параметром v=<ETag без
+        кавычек> не меняется и кэшируется клиентом надолго.
+        """
+        try:
+            course_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        user = request.user
+        if not (is_teacher(user) or course_id in subscription_index.course_ids(user.pk)):
+            raise PermissionDenied("Course content is available to subscribers only.")
+        bundle = get_course_bundle(course_id)
+        if bundle is None:
+            raise NotFound()
+
+        etag = bundle["etag"]
+        headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+        if request.query_params.get("v") == etag.strip('"'):
+            headers["Cache-Control"] = "private, max-age=31536000, immutable"
+        else:
+            headers["Cache-Control"] = "private, no-cache"
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        content = bundle["content"]
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            content = gzip.decompress(content)
+        return HttpResponse(content, content_type="application/json", headers=headers)
 
 
 class MaterialCreateAPIView(CreateAPIView):
@@ -73,12 +192,12 @@ class MaterialListAPIView(ListAPIView):
         user = self.request.user
 
         if user.is_authenticated:
-            subscribed_courses = Subscription.objects.filter(
-                user=user, is_subscribed=True
-            ).values_list("course", flat=True)
+            subscribed_courses = subscription_index.course_ids(user.pk)
 
-            return Material.objects.filter(course__in=subscribed_courses).union(
-                Material.objects.filter(owner=user)
+            # Одно условие OR вместо UNION: планировщик может объединить
+            # выборки по индексам course_id и owner_id
+            return Material.objects.filter(
+                Q(course_id__in=subscribed_courses) | Q(owner_id=user.pk)
             )
         else:
             raise PermissionDenied(
@@ -98,20 +217,8 @@ class MaterialUpdateAPIView(UpdateAPIView):
     permission_classes = [IsAuthenticated, IsTeacher]
 
     def perform_update(self, serializer):
-        updated_material = serializer.save()
-        # Найти курс, к которому относится обновленный материал
-        course = updated_material.course
-        print(f"Обновленный материал: {updated_material}")
-        print(f"Курс материала: {course}")
-
-        # Найти все подписки на курс
-        subscribers = Subscription.objects.filter(course=course, is_subscribed=True)
-        print(f"Найденные подписчики: {subscribers}")
-        for subscriber in subscribers:
-            print(f"Отправка уведомления для {subscriber.user.email}")
-            send_update_notification.delay(
-                subscriber.user.email, updated_material.title
-            )
+        # Письмо уйдет сводкой задачей flush_course_updates
+        record_course_update(serializer.save())
 
 
 class MaterialDestroyAPIView(DestroyAPIView):
@@ -121,9 +228,9 @@ class MaterialDestroyAPIView(DestroyAPIView):
 
 
 class TestViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Test.objects.all()
+    queryset = Test.objects.prefetch_related("answer_options")
     serializer_class = TestSerializer
-    pagination_class = CustomOffsetPagination
+    pagination_class = TestKeysetPagination
 
     def get_permissions(self):
         if self.request.method in ["POST", "PUT", "PATCH", "DELETE"]:
@@ -142,20 +249,13 @@ class TestViewSet(viewsets.ReadOnlyModelViewSet):
         queryset = super().get_queryset()
 
         if user.is_authenticated:
-            if user.groups.filter(name="Преподаватели").exists():
+            if is_teacher(user):
                 queryset = queryset.filter(material__owner=user)
 
             else:  # Студенты
-                # Получаем список материалов, на которые студент подписан
-                subscribed_courses = Subscription.objects.filter(
-                    user=user, is_subscribed=True
-                ).values_list("course", flat=True)
-                material_ids = Material.objects.filter(
-                    course__in=subscribed_courses
-                ).values_list("id", flat=True)
-
                 # Фильтруем тесты по материалам, на которые студент подписан
-                queryset = queryset.filter(material__id__in=material_ids)
+                material_ids = subscription_index.material_ids(user.pk)
+                queryset = queryset.filter(material_id__in=material_ids)
 
         # Фильтрация по материалу через запрос
         material_id = self.request.query_params.get("material_id")
@@ -169,11 +269,6 @@ class TestViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
 
 class StudentAnswerViewSet(viewsets.ModelViewSet):
     """Класс ответов студентов на тесты"""
@@ -195,13 +290,35 @@ class StudentAnswerViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Создание студентом ответов на тесты"""
+        if settings.GRADING_ASYNC:
+            # Ответ проверит задача grade_pending_answers
+            serializer.save(
+                student=self.request.user,
+                grading_status=StudentAnswer.GradingStatus.PENDING,
+            )
+            return
         selected_answer_text = self.request.data.get("selected_answer")
         test = serializer.validated_data["test"]
-        correct_answer = AnswerOption.objects.filter(test=test, is_correct=True).first()
-        is_correct = (
-            correct_answer and correct_answer.answer_text == selected_answer_text
+        answer_keys = get_answer_keys([test.id])
+        is_correct = is_correct_answer(answer_keys, test.id, selected_answer_text)
+        with transaction.atomic():
+            answer = serializer.save(student=self.request.user, is_correct=is_correct)
+            record_graded_answers([answer])
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        """Отправка ответов на весь тест одним запросом"""
+        serializer = StudentAnswerBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        answers = submit_answers(
+            request.user,
+            serializer.validated_data["answers"],
+            grade=not settings.GRADING_ASYNC,
+        )
+        return Response(
+            StudentAnswerSerializer(answers, many=True).data,
+            status=status.HTTP_201_CREATED,
         )
-        serializer.save(student=self.request.user, is_correct=is_correct)
 
 
 class CheckAnswersView(APIView):
@@ -209,9 +326,9 @@ class CheckAnswersView(APIView):
 
     def get_permissions(self):
         """Определение разрешений для просмотра ответов"""
-        if self.request.user.groups.filter(name="Студенты").exists():
+        if is_student(self.request.user):
             return [IsAuthenticated(), IsStudent()]
-        elif self.request.user.groups.filter(name="Преподаватели").exists():
+        elif is_teacher(self.request.user):
             return [IsAuthenticated(), IsTeacher()]
         return [IsAuthenticated()]  # По умолчанию доступен для аутентифицированных пользователей
 
@@ -229,10 +346,10 @@ class CheckAnswersView(APIView):
         test_ids = tests.values_list('id', flat=True)
 
         # Проверяем роль пользователя и получаем ответы
-        if request.user.groups.filter(name="Студенты").exists():
+        if is_student(request.user):
             # Студенты могут видеть только свои ответы
             answers = StudentAnswer.objects.filter(student=request.user, test_id__in=test_ids)
-        elif request.user.groups.filter(name="Преподаватели").exists():
+        elif is_teacher(request.user):
             # Преподаватели могут видеть ответы студентов по материалу
             answers = StudentAnswer.objects.filter(test_id__in=test_ids)
         else:
@@ -241,7 +358,173 @@ class CheckAnswersView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Сериализуем ответы
-        serializer = StudentAnswerSerializer(answers, many=True)
+        # attempts=latest - только последняя попытка по каждому тесту
+        if request.query_params.get("attempts") == "latest":
+            answers = latest_attempts(answers)
+
+        if request.query_params.get("mode") == "summary":
+            # Итоги по студентам и тестам считаются в БД
+            return Response(answer_summary(answers))
+
+        # Ответов по материалу может быть очень много: отдаем их потоком
+        return StreamingJSONResponse(answers.order_by("id"), StudentAnswerSerializer)
+
+
+class StudentProgressAPIView(APIView):
+    """Прогресс студента по курсу"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        student_id = request.user.pk
+        # Преподаватели могут смотреть прогресс любого студента
+        if is_teacher(request.user) and "student_id" in request.query_params:
+            try:
+                student_id = int(request.query_params["student_id"])
+            except ValueError:
+                return Response(
+                    {"detail": "student_id must be an integer."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        progress = StudentProgress.objects.filter(
+            student_id=student_id, course_id=course_id
+        ).first() or StudentProgress(student_id=student_id, course_id=course_id)
+        materials = MaterialProgress.objects.filter(
+            student_id=student_id, course_id=course_id
+        ).order_by("material_id")
+
+        data = StudentProgressSerializer(progress).data
+        data["materials"] = MaterialProgressSerializer(materials, many=True).data
+        return Response(data)
+
+
+class LeaderboardAPIView(APIView):
+    """Рейтинг студентов курса: первые limit мест и место текущего пользователя.
+
+    Доступен подписчикам курса, преподавателям и владельцу курса. Студенты
+    в рейтинге обозначаются id и именем, почта не раскрывается.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        user = request.user
+        if not (
+            is_teacher(user)
+            or course_id in subscription_index.course_ids(user.pk)
+            or Course.objects.filter(pk=course_id, owner_id=user.pk).exists()
+        ):
+            raise PermissionDenied("The leaderboard is available to course subscribers only.")
+        try:
+            limit = int(request.query_params.get("limit", LEADERBOARD_SIZE))
+        except ValueError:
+            return Response(
+                {"detail": "limit must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(max(limit, 1), LEADERBOARD_MAX_SIZE)
+
+        top = leaderboard.top(course_id, limit)
+        names = {
+            student_id: f"{first_name} {last_name}".strip() or None
+            for student_id, first_name, last_name in User.objects.filter(
+                id__in=[entry["student"] for entry in top]
+            ).values_list("id", "first_name", "last_name")
+        }
+        for entry in top:
+            entry["name"] = names.get(entry["student"])
+        return Response(
+            {
+                "course": course_id,
+                "top": top,
+                "me": leaderboard.position(course_id, user.pk),
+            }
+        )
+
+
+class AnswerActivityAPIView(APIView):
+    """Сводки активности по курсу за часы или дни.
+
+    Параметры: period (hour или day), material_id (без него - итоги курса),
+    since и until в формате ISO 8601. По умолчанию отдаются последние
+    7 дней для часовых сводок и 90 дней для дневных.
+    """
+
+    permission_classes = [IsAuthenticated, IsTeacher]
+    default_ranges = {
+        AnswerActivityRollup.Period.HOUR: timedelta(days=7),
+        AnswerActivityRollup.Period.DAY: timedelta(days=90),
+    }
+
+    def get(self, request, course_id):
+        params = request.query_params
+        period = params.get("period", AnswerActivityRollup.Period.HOUR)
+        if period not in AnswerActivityRollup.Period.values:
+            return Response(
+                {"detail": "period must be hour or day."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            since = self.parse_bound(params, "since")
+            until = self.parse_bound(params, "until")
+            material_id = int(params["material_id"]) if "material_id" in params else None
+        except ValueError:
+            return Response(
+                {"detail": "since and until must be ISO 8601 datetimes, material_id an integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = AnswerActivityRollup.objects.filter(
+            course_id=course_id,
+            period=period,
+            material_id=material_id,
+            bucket_start__gte=since or timezone.now() - self.default_ranges[period],
+        ).order_by("bucket_start")
+        if until:
+            rollups = rollups.filter(bucket_start__lt=until)
+        return Response(AnswerActivityRollupSerializer(rollups, many=True).data)
+
+    @staticmethod
+    def parse_bound(params, name):
+        if name not in params:
+            return None
+        value = parse_datetime(params[name])
+        if value is None:
+            raise ValueError(f"invalid {name}")
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+
+class ArchivedAnswersAPIView(APIView):
+    """Архивные ответы студентов по курсу (NDJSON, потоком).
+
+    Студент получает только свои ответы, преподаватель - все или ответы
+    одного студента (параметр student_id).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        course = get_object_or_404(Course, pk=course_id)
+        if is_teacher(request.user):
+            try:
+                student_id = (
+                    int(request.query_params["student_id"])
+                    if "student_id" in request.query_params
+                    else None
+                )
+            except ValueError:
+                return Response(
+                    {"detail": "student_id must be an integer."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif is_student(request.user):
+            student_id = request.user.pk
+        else:
+            raise PermissionDenied("Only students and teachers can access archived answers.")
 
-        return Response(serializer.data)
\ No newline at end of file
+        return StreamingHttpResponse(
+            buffered(iter_archived_answers(course.pk, student_id)),
+            content_type="application/x-ndjson",
+        )
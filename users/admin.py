@@ -1,5 +1,5 @@
 from django.contrib import admin
-from learning_platform.models import Course, Material, Test, AnswerOption, StudentAnswer
+from learning_platform.models import Course, Material, Test, AnswerOption, StudentAnswer, StudentProgress
 from .models import User, Subscription, Payment
 
 
@@ -73,14 +73,7 @@ class StudentAnswerAdmin(admin.ModelAdmin):
     list_filter = ('id', 'student', 'is_correct')
 
 
-
-
-
-
-
-
-
-
-
-
-
+@admin.register(StudentProgress)
+class StudentProgressAdmin(admin.ModelAdmin):
+    list_display = ('id', 'student', 'course', 'answers_count', 'correct_answers_count', 'completed_tests')
+    list_filter = ('course',)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.roles import ROLES_REQUEST_ATTR, get_roles_version
+from users.tokens import ROLES_CLAIM, ROLES_VERSION_CLAIM
+
+
+class TokenBackedUser(SimpleLazyObject):
+    """Пользователь, восстановленный из access-токена.
+
+    pk и роли берутся из токена, поэтому проверка разрешений не обращается
+    к БД. Строка users.User загружается только при обращении к остальным полям.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, validated_token):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+        self.__dict__["_token_user_id"] = user_id
+        self.__dict__[ROLES_REQUEST_ATTR] = frozenset(validated_token[ROLES_CLAIM])
+
+    @property
+    def pk(self):
+        return self.__dict__["_token_user_id"]
+
+    id = pk
+
+    def __bool__(self):
+        # IsAuthenticated проверяет bool(request.user), что без переопределения
+        # загрузило бы строку пользователя
+        return True
+
+
+class RoleJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация по ролям из токена.
+
+    Токен принимается, только если версия ролей в нем совпадает с текущей
+    версией пользователя: после изменения групп клиент должен обновить токен.
+    """
+
+    def get_user(self, validated_token):
+        if ROLES_VERSION_CLAIM not in validated_token:
+            # Токены, выданные до появления ролей в токене
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        if validated_token[ROLES_VERSION_CLAIM] != get_roles_version(user_id):
+            raise InvalidToken("User roles have changed, refresh the token")
+
+        return TokenBackedUser(validated_token)
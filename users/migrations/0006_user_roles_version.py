@@ -0,0 +1,20 @@
+# Generated by Django 5.1 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_alter_payment_pay_amount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="roles_version",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="версия ролей пользователя"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0007_hot_path_indexes"),
+        ("users", "0006_user_roles_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["user", "pay_data"], name="payment_user_pay_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["user", "is_subscribed"], name="subscription_user_active_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["course", "is_subscribed"],
+                name="subscription_course_active_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1 on 2026-10-18 20:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_platform", "0017_drop_covered_fk_indexes"),
+        ("users", "0007_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="пользователь",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="subscription",
+            name="course",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="learning_platform.course",
+                verbose_name="курс",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="subscription",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="пользователь",
+            ),
+        ),
+    ]
@@ -17,6 +17,9 @@ class User(AbstractUser):
         upload_to="users/", verbose_name="аватар пользователя", **NULLABLE
     )
     city = models.CharField(max_length=10, verbose_name="город", **NULLABLE)
+    roles_version = models.PositiveIntegerField(
+        default=0, verbose_name="версия ролей пользователя"
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -25,9 +28,25 @@ class User(AbstractUser):
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
 
+    def save(self, *args, **kwargs):
+        # roles_version меняется только через invalidate_user_roles (F-выражением),
+        # поэтому полное сохранение не должно перезаписывать его устаревшим значением
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != "roles_version"
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class Payment(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='пользователь')
+    # Покрывается индексом payment_user_pay_data_idx
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='пользователь',
+                             db_index=False)
     pay_data = models.DateField(auto_now_add=True, verbose_name='дата оплаты')
     pay_course = models.ForeignKey(Course, verbose_name='оплаченный курс', on_delete=models.CASCADE)
     pay_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='сумма оплаты', **NULLABLE)
@@ -41,11 +60,16 @@ class Payment(models.Model):
     class Meta:
         verbose_name = 'Платеж'
         verbose_name_plural = 'Платежи'
+        indexes = [
+            models.Index(fields=['user', 'pay_data'], name='payment_user_pay_data_idx'),
+        ]
 
 
 class Subscription(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='пользователь')
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name='курс')
+    # Покрываются индексами subscription_user_active_idx и subscription_course_active_idx
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='пользователь',
+                             db_index=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name='курс', db_index=False)
     is_subscribed = models.BooleanField(default=False, verbose_name='подписка')
 
     def __str__(self):
@@ -55,4 +79,8 @@ class Subscription(models.Model):
         verbose_name = 'подписка'
         verbose_name_plural = 'подписки'
         unique_together = ('user', 'course')
+        indexes = [
+            models.Index(fields=['user', 'is_subscribed'], name='subscription_user_active_idx'),
+            models.Index(fields=['course', 'is_subscribed'], name='subscription_course_active_idx'),
+        ]
 
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+STUDENTS_GROUP = "Студенты"
+TEACHERS_GROUP = "Преподаватели"
+
+ROLES_CACHE_TIMEOUT = 60 * 60
+ROLES_REQUEST_ATTR = "_cached_roles"
+
+
+def roles_cache_key(user_id):
+    return f"users:roles:{user_id}"
+
+
+def roles_version_cache_key(user_id):
+    return f"users:roles_version:{user_id}"
+
+
+def get_user_roles(user):
+    """Возвращает названия групп пользователя.
+
+    Результат запоминается на объекте пользователя (на время запроса)
+    и в общем кэше, который сбрасывается при изменении групп пользователя.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, ROLES_REQUEST_ATTR, None)
+    if roles is not None:
+        return roles
+
+    key = roles_cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is None:
+        cached = list(user.groups.values_list("name", flat=True))
+        cache.set(key, cached, ROLES_CACHE_TIMEOUT)
+
+    roles = frozenset(cached)
+    setattr(user, ROLES_REQUEST_ATTR, roles)
+    return roles
+
+
+def has_role(user, role):
+    """Проверяет, состоит ли пользователь в группе с названием role"""
+    return role in get_user_roles(user)
+
+
+def is_student(user):
+    return has_role(user, STUDENTS_GROUP)
+
+
+def is_teacher(user):
+    return has_role(user, TEACHERS_GROUP)
+
+
+def get_roles_version(user_id):
+    """Текущая версия ролей пользователя (None, если пользователь удален).
+
+    Прочитанная из БД версия кладется в кэш через add: если за время чтения
+    invalidate_user_roles уже записала новую версию, старая ее не затрет.
+    """
+    key = roles_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            get_user_model()
+            .objects.filter(pk=user_id)
+            .values_list("roles_version", flat=True)
+            .first()
+        )
+        if version is not None:
+            cache.add(key, version, ROLES_CACHE_TIMEOUT)
+    return version
+
+
+def forget_user_roles(*user_ids):
+    """Сбрасывает закэшированные роли пользователей"""
+    if user_ids:
+        cache.delete_many(
+            [roles_cache_key(user_id) for user_id in user_ids]
+            + [roles_version_cache_key(user_id) for user_id in user_ids]
+        )
+
+
+def refresh_roles_cache(user_ids):
+    """Сбрасывает роли пользователей и записывает в кэш их версии ролей из БД"""
+    cache.delete_many([roles_cache_key(user_id) for user_id in user_ids])
+    versions = (
+        get_user_model().objects.filter(pk__in=user_ids).values_list("pk", "roles_version")
+    )
+    cache.set_many(
+        {roles_version_cache_key(user_id): version for user_id, version in versions},
+        ROLES_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_user_roles(*user_ids):
+    """Сбрасывает кэш ролей и увеличивает версию ролей пользователей,
+    чтобы выданные ранее токены с ролями перестали приниматься.
+
+    Новая версия записывается в кэш сразу и еще раз после коммита, а не
+    только удаляется: иначе запрос, прочитавший версию до изменения, мог бы
+    вернуть в кэш старое значение.
+    """
+    if user_ids:
+        get_user_model().objects.filter(pk__in=user_ids).update(
+            roles_version=F("roles_version") + 1
+        )
+        refresh_roles_cache(user_ids)
+        transaction.on_commit(lambda: refresh_roles_cache(user_ids))
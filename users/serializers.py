@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import Group
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
 from learning_platform.serializers import CourseSerializer
 from users.models import Payment, User, Subscription
+from users.tokens import RoleRefreshToken
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -45,6 +47,9 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         fields = ['user', 'course', 'is_subscribed']
 
 
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
 
 
-
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
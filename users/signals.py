@@ -0,0 +1,45 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import User
+from users.roles import ROLES_REQUEST_ATTR, forget_user_roles, invalidate_user_roles
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_roles_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сброс кэша ролей при изменении состава групп пользователя"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.__dict__.pop(ROLES_REQUEST_ATTR, None)
+            invalidate_user_roles(instance.pk)
+        return
+
+    # Изменение со стороны группы: group.user_set.add(...) / clear()
+    if action == "pre_clear":
+        instance._cleared_user_ids = list(instance.user_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        invalidate_user_roles(*pk_set)
+    elif action == "post_clear":
+        invalidate_user_roles(*getattr(instance, "_cleared_user_ids", []))
+
+
+@receiver(post_save, sender=Group)
+def reset_roles_on_group_rename(sender, instance, created, **kwargs):
+    """Роли хранятся по названию группы, поэтому переименование сбрасывает кэш участников"""
+    if not created:
+        invalidate_user_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def reset_roles_on_group_delete(sender, instance, **kwargs):
+    invalidate_user_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=User)
+def reset_roles_on_user_save(sender, instance, created, **kwargs):
+    if created:
+        forget_user_roles(instance.pk)
+    elif not instance.is_active:
+        # Токены деактивированного пользователя больше не принимаются
+        invalidate_user_roles(instance.pk)
@@ -1,10 +1,15 @@
 from unittest.mock import patch, Mock
 
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
 from django.urls import reverse
+from .authentication import RoleJWTAuthentication
 from .models import Course, Payment, Subscription, User
+from .roles import get_roles_version, get_user_roles, invalidate_user_roles, is_student, is_teacher
+from django.core.cache import cache
 from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 class PaymentAPIViewTests(APITestCase):
@@ -114,5 +119,112 @@ class UserCreateAPIViewTests(APITestCase):
         response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_registered_user_can_use_token(self):
+        Group.objects.create(name='Студенты')
+        data = {'email': 'student@example.com', 'password': 'newpassword', 'groups': ['Студенты']}
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(User.objects.get(email='student@example.com').roles_version, 1)
+
+        response = self.client.post(
+            reverse('users:token_obtain_pair'),
+            {'email': 'student@example.com', 'password': 'newpassword'},
+        )
+        access = response.json()['access']
+        response = self.client.get(reverse('users:payment-list'), HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_full_save_keeps_roles_version(self):
+        user = User.objects.create(email='stale@example.com')
+        stale = User.objects.get(pk=user.pk)
+        invalidate_user_roles(user.pk)
+        stale.first_name = 'Иван'
+        stale.save()
+        user.refresh_from_db()
+        self.assertEqual(user.first_name, 'Иван')
+        self.assertEqual(user.roles_version, 1)
+
+
+class RoleResolutionTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='roles@example.com')
+        self.group_teachers = Group.objects.create(name='Преподаватели')
+        self.group_students = Group.objects.create(name='Студенты')
+        self.user.groups.add(self.group_students)
+
+    def test_roles_are_memoized(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_student(user))
+            self.assertFalse(is_teacher(user))
+        # Новый объект пользователя берет роли из общего кэша
+        with self.assertNumQueries(0):
+            self.assertTrue(is_student(User(pk=self.user.pk)))
 
+    def test_roles_invalidated_on_groups_change(self):
+        self.assertEqual(get_user_roles(self.user), {'Студенты'})
+        self.user.groups.remove(self.group_students)
+        self.group_teachers.user_set.add(self.user)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_user_roles(user), {'Преподаватели'})
+        self.group_teachers.user_set.clear()
+        self.assertEqual(get_user_roles(User.objects.get(pk=self.user.pk)), set())
 
+
+class RoleTokenTests(APITestCase):
+
+    def setUp(self):
+        self.group_students = Group.objects.create(name='Студенты')
+        self.user = User.objects.create(email='token@example.com')
+        self.user.set_password('password')
+        self.user.save()
+        self.user.groups.add(self.group_students)
+        response = self.client.post(
+            reverse('users:token_obtain_pair'),
+            {'email': 'token@example.com', 'password': 'password'},
+        )
+        self.tokens = response.json()
+
+    def authenticate(self, access):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return RoleJWTAuthentication().authenticate(request)
+
+    def test_roles_served_from_token(self):
+        user, token = self.authenticate(self.tokens['access'])
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token['roles'], ['Студенты'])
+
+        url = reverse('users:payment-list')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # IsAuthenticated и IsStudent проверяются по токену, строка пользователя не загружается
+        self.assertFalse([query for query in queries if '"users_user"' in query['sql']])
+
+    def test_stale_token_rejected_after_groups_change(self):
+        self.user.groups.remove(self.group_students)
+        url = reverse('users:payment-list')
+        response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(reverse('users:token_refresh'), {'refresh': self.tokens['refresh']})
+        access = response.json()['access']
+        user, token = self.authenticate(access)
+        self.assertEqual(token['roles'], [])
+        self.assertFalse(is_student(user))
+
+    def test_stale_reader_does_not_restore_old_version(self):
+        cache.clear()
+        old_version = User.objects.get(pk=self.user.pk).roles_version
+        add = cache.add
+
+        def add_after_invalidation(key, value, timeout):
+            # Группы изменились между чтением версии из БД и записью в кэш
+            invalidate_user_roles(self.user.pk)
+            return add(key, value, timeout)
+
+        with patch.object(cache, 'add', side_effect=add_after_invalidation):
+            self.assertEqual(get_roles_version(self.user.pk), old_version)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_roles_version(self.user.pk), old_version + 1)
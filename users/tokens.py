@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from users.roles import get_user_roles
+
+ROLES_CLAIM = "roles"
+ROLES_VERSION_CLAIM = "roles_version"
+
+
+def set_role_claims(token, user):
+    """Записывает в токен роли пользователя и текущую версию ролей"""
+    token[ROLES_CLAIM] = sorted(get_user_roles(user))
+    token[ROLES_VERSION_CLAIM] = user.roles_version
+
+
+class RoleAccessToken(AccessToken):
+    """Access-токен с ролями пользователя"""
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh-токен, выдающий access-токены с актуальными ролями"""
+
+    access_token_class = RoleAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_role_claims(token, user)
+        token.user = user
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        # При обновлении токена роли могли измениться с момента выдачи
+        user = getattr(self, "user", None) or (
+            get_user_model()
+            .objects.filter(pk=self.payload.get(api_settings.USER_ID_CLAIM))
+            .first()
+        )
+        if user is None or not user.is_active:
+            raise TokenError("User not found")
+        set_role_claims(access, user)
+        return access
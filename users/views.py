@@ -88,7 +88,7 @@ class UserCreateAPIView(CreateAPIView):
     def perform_create(self, serializer):
         user = serializer.save(is_active=True)
         user.set_password(user.password)
-        user.save()
+        user.save(update_fields=["password"])
 
 
 class SubscriptionHandlerAPIView(APIView):